@@ -0,0 +1,268 @@
+# cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from config import (CACHE_DB_PATH, SEARCH_CACHE_TTL_SEC, SEARCH_CACHE_MAX_ENTRIES,
+                    CRAWL_CACHE_TTL_SEC, CRAWL_CACHE_MAX_ENTRIES, PATH_MEMORY_NEGATIVE_TTL_SEC)
+
+def connect(path=CACHE_DB_PATH):
+    """Open a SQLite connection that can be shared between threads"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+def normalize_url(url):
+    """Canonical form of a URL so trivially different spellings share a cache entry"""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or 'http').lower()
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and not ((scheme == 'http' and parts.port == 80) or (scheme == 'https' and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip('/') or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+class SearchCache:
+    """Persistent cache of search API responses with TTL expiry and a size cap"""
+
+    def __init__(self, path=CACHE_DB_PATH, ttl=SEARCH_CACHE_TTL_SEC, max_entries=SEARCH_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_accessed ON search_cache (accessed_at)")
+
+    @staticmethod
+    def make_key(endpoint, query, num_results, **params):
+        raw = json.dumps([endpoint, query, num_results, params], sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                with self._conn:
+                    self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE search_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, response):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, response, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(response), now, now)
+            )
+            self._evict()
+
+    def _evict(self):
+        # Drop expired entries first, then the least recently used beyond the cap
+        self._conn.execute("DELETE FROM search_cache WHERE created_at < ?", (time.time() - self.ttl,))
+        self._conn.execute("""
+            DELETE FROM search_cache WHERE key IN (
+                SELECT key FROM search_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM search_cache")
+
+
+class CrawlCache:
+    """Fetched pages and what was parsed from them, with LRU eviction past a size cap"""
+
+    def __init__(self, path=CACHE_DB_PATH, ttl=CRAWL_CACHE_TTL_SEC, max_entries=CRAWL_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_cache (
+                    url TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    html TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    result TEXT,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (url, kind)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_crawl_cache_accessed ON crawl_cache (accessed_at)")
+
+    def get(self, url, kind, max_age=None):
+        """Return the cached entry as a dict with a 'fresh' flag, or None.
+
+        max_age overrides the cache's TTL for this lookup.
+        """
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT html, etag, last_modified, result, fetched_at FROM crawl_cache WHERE url = ? AND kind = ?",
+                (key, kind)
+            ).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE crawl_cache SET accessed_at = ? WHERE url = ? AND kind = ?", (now, key, kind))
+        return {
+            'html': row[0],
+            'etag': row[1],
+            'last_modified': row[2],
+            'result': json.loads(row[3]) if row[3] is not None else None,
+            'fresh': now - row[4] <= (self.ttl if max_age is None else max_age)
+        }
+
+    def set(self, url, kind, html, result, etag=None, last_modified=None):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO crawl_cache (url, kind, html, etag, last_modified, result, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), kind, html, etag, last_modified, json.dumps(result), now, now)
+            )
+            self._conn.execute("""
+                DELETE FROM crawl_cache WHERE rowid IN (
+                    SELECT rowid FROM crawl_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    def revalidated(self, url, kind):
+        """Mark an entry fresh again after the server answered 304 Not Modified"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE crawl_cache SET fetched_at = ?, accessed_at = ? WHERE url = ? AND kind = ?",
+                (now, now, normalize_url(url), kind)
+            )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM crawl_cache")
+
+
+class PathMemory:
+    """Remembers which leadership page path worked per domain and how often each path works overall"""
+
+    def __init__(self, path=CACHE_DB_PATH, negative_ttl=PATH_MEMORY_NEGATIVE_TTL_SEC):
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS path_probes (
+                    domain TEXT PRIMARY KEY,
+                    path TEXT,
+                    checked_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS path_stats (
+                    path TEXT PRIMARY KEY,
+                    successes INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+
+    def order_paths(self, domain, paths):
+        """Paths to probe for a domain, most likely first.
+
+        Returns an empty list when a recent probe found nothing on this domain.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, checked_at FROM path_probes WHERE domain = ?", (domain,)
+            ).fetchone()
+            stats = dict(
+                (path, (successes + 1) / (attempts + 2))
+                for path, successes, attempts in self._conn.execute("SELECT path, successes, attempts FROM path_stats")
+            )
+
+        if row is not None and row[0] is None and time.time() - row[1] <= self.negative_ttl:
+            return []
+
+        # Smoothed success rate across domains, ties keep the caller's order
+        ordered = sorted(paths, key=lambda path: -stats.get(path, 0.5))
+        if row is not None and row[0] in ordered:
+            ordered.remove(row[0])
+            ordered.insert(0, row[0])
+        return ordered
+
+    def record(self, domain, found_path, tried_paths):
+        """Store the outcome of probing a domain, found_path is None when nothing worked"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO path_probes (domain, path, checked_at) VALUES (?, ?, ?)",
+                (domain, found_path, time.time())
+            )
+            for path in tried_paths:
+                self._conn.execute(
+                    "INSERT INTO path_stats (path, successes, attempts) VALUES (?, ?, 1) "
+                    "ON CONFLICT(path) DO UPDATE SET successes = successes + excluded.successes, attempts = attempts + 1",
+                    (path, 1 if path == found_path else 0)
+                )
+
+    def forget(self, domain):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM path_probes WHERE domain = ?", (domain,))
+
+
+_search_cache = None
+_crawl_cache = None
+_path_memory = None
+_cache_lock = threading.Lock()
+
+def get_search_cache():
+    global _search_cache
+    if _search_cache is None:
+        with _cache_lock:
+            if _search_cache is None:
+                _search_cache = SearchCache()
+    return _search_cache
+
+def get_crawl_cache():
+    global _crawl_cache
+    if _crawl_cache is None:
+        with _cache_lock:
+            if _crawl_cache is None:
+                _crawl_cache = CrawlCache()
+    return _crawl_cache
+
+def get_path_memory():
+    global _path_memory
+    if _path_memory is None:
+        with _cache_lock:
+            if _path_memory is None:
+                _path_memory = PathMemory()
+    return _path_memory
@@ -0,0 +1,199 @@
+# checkpoint.py
+
+import json
+import threading
+import time
+import uuid
+from datetime import datetime
+from cache import connect
+from config import CHECKPOINT_DB_PATH
+
+_schema_lock = threading.Lock()
+
+def new_run_id():
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+def _dumps(item):
+    # Lead records are stored as the plain dicts they stand in for
+    return json.dumps(item, default=lambda value: value.to_dict())
+
+def _open(path):
+    conn = connect(path)
+    with _schema_lock, conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                settings TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS run_stages (
+                run_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                completed_at REAL NOT NULL,
+                PRIMARY KEY (run_id, stage)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS run_items (
+                run_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (run_id, stage, position)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS run_metrics (
+                run_id TEXT PRIMARY KEY,
+                metrics TEXT NOT NULL,
+                saved_at REAL NOT NULL
+            )
+        """)
+    return conn
+
+
+class RunCheckpoint:
+    """Stage outputs of one pipeline run, saved as they are produced so the run can resume"""
+
+    def __init__(self, run_id, path=CHECKPOINT_DB_PATH):
+        self.run_id = run_id
+        self._lock = threading.Lock()
+        self._conn = _open(path)
+
+    def exists(self):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM runs WHERE run_id = ?", (self.run_id,)).fetchone() is not None
+
+    def start(self, settings):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, settings, status, created_at, updated_at) VALUES (?, ?, 'running', ?, ?)",
+                (self.run_id, json.dumps(settings), now, now)
+            )
+
+    def load_settings(self):
+        with self._lock:
+            row = self._conn.execute("SELECT settings FROM runs WHERE run_id = ?", (self.run_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_status(self, status):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ?", (status, time.time(), self.run_id)
+            )
+
+    def is_complete(self, stage):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM run_stages WHERE run_id = ? AND stage = ?", (self.run_id, stage)
+            ).fetchone() is not None
+
+    def complete_stage(self, stage, items=None):
+        """Mark a stage finished, replacing its saved items when given"""
+        now = time.time()
+        with self._lock, self._conn:
+            if items is not None:
+                self._replace_items(stage, items)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO run_stages (run_id, stage, completed_at) VALUES (?, ?, ?)",
+                (self.run_id, stage, now)
+            )
+            self._conn.execute("UPDATE runs SET updated_at = ? WHERE run_id = ?", (now, self.run_id))
+
+    def replace_items(self, stage, items):
+        """Save items as the stage's only items, numbered in order"""
+        with self._lock, self._conn:
+            self._replace_items(stage, items)
+
+    def _replace_items(self, stage, items):
+        self._conn.execute("DELETE FROM run_items WHERE run_id = ? AND stage = ?", (self.run_id, stage))
+        self._conn.executemany(
+            "INSERT INTO run_items (run_id, stage, position, payload) VALUES (?, ?, ?, ?)",
+            ((self.run_id, stage, position, _dumps(item)) for position, item in enumerate(items))
+        )
+
+    def save_item(self, stage, position, item):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO run_items (run_id, stage, position, payload) VALUES (?, ?, ?, ?)",
+                (self.run_id, stage, position, _dumps(item))
+            )
+
+    def mark_exported(self, positions):
+        """Record that the enriched leads at these positions are safely in the export file"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO run_items (run_id, stage, position, payload) VALUES (?, 'export', ?, 'true')",
+                ((self.run_id, position) for position in positions)
+            )
+
+    def exported_positions(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT position FROM run_items WHERE run_id = ? AND stage = 'export'", (self.run_id,)
+            ).fetchall()
+        return {position for position, in rows}
+
+    def reset_stages(self, *stages):
+        """Drop saved items and completion marks so the stages run again from scratch"""
+        with self._lock, self._conn:
+            for stage in stages:
+                self._conn.execute("DELETE FROM run_items WHERE run_id = ? AND stage = ?", (self.run_id, stage))
+                self._conn.execute("DELETE FROM run_stages WHERE run_id = ? AND stage = ?", (self.run_id, stage))
+
+    def load_items(self, stage):
+        """Saved items of a stage as {position: item}"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT position, payload FROM run_items WHERE run_id = ? AND stage = ? ORDER BY position",
+                (self.run_id, stage)
+            ).fetchall()
+        return {position: json.loads(payload) for position, payload in rows}
+
+    def count_items(self, stage):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM run_items WHERE run_id = ? AND stage = ?", (self.run_id, stage)
+            ).fetchone()[0]
+
+    def recent_items(self, stage, limit=20):
+        """The last items saved for a stage, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM run_items WHERE run_id = ? AND stage = ? ORDER BY rowid DESC LIMIT ?",
+                (self.run_id, stage, limit)
+            ).fetchall()
+        return [json.loads(payload) for payload, in reversed(rows)]
+
+
+    def save_metrics(self, metrics):
+        """Keep a metrics snapshot as the run's report, replacing the previous one"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO run_metrics (run_id, metrics, saved_at) VALUES (?, ?, ?)",
+                (self.run_id, json.dumps(metrics), time.time())
+            )
+
+    def load_metrics(self):
+        with self._lock:
+            row = self._conn.execute("SELECT metrics FROM run_metrics WHERE run_id = ?", (self.run_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+def list_runs(path=CHECKPOINT_DB_PATH, status=None):
+    """Most recent runs first as (run_id, status, updated_at) tuples"""
+    conn = _open(path)
+    try:
+        query = "SELECT run_id, status, updated_at FROM runs"
+        params = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        return conn.execute(query + " ORDER BY updated_at DESC", params).fetchall()
+    finally:
+        conn.close()
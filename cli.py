@@ -0,0 +1,121 @@
+# cli.py
+
+import argparse
+import json
+import os
+import sys
+from config import (SERPER_API_KEY, MAX_COMPANIES, DEFAULT_FILTERS, DEFAULT_RANKING_CRITERIA, DEDUP_ENABLED,
+                    LEAD_STORE_SKIP_ENRICHED, MAX_PAGES_PER_SEARCH)
+from checkpoint import RunCheckpoint, list_runs, new_run_id
+from exporter import export_leads, StreamingExporter, EXPORT_FORMATS
+from metrics import write_metrics
+from pipeline import iter_pipeline, run_pipeline
+
+def default_settings():
+    return {
+        'data_source': 'serper',
+        'directory_urls': [],
+        'max_pages': MAX_PAGES_PER_SEARCH,
+        'industries': list(DEFAULT_FILTERS['industries']),
+        'max_companies': MAX_COMPANIES,
+        'use_search_cache': True,
+        'refresh_search_cache': False,
+        'deduplicate': DEDUP_ENABLED,
+        'skip_enriched': LEAD_STORE_SKIP_ENRICHED,
+        'filters': dict(DEFAULT_FILTERS),
+        'ranking_criteria': dict(DEFAULT_RANKING_CRITERIA)
+    }
+
+def load_settings(path=None):
+    """Pipeline settings from a JSON file, falling back to the defaults in config.py"""
+    settings = default_settings()
+    if path:
+        with open(path, encoding='utf-8') as f:
+            settings.update(json.load(f))
+    return settings
+
+def print_progress(value, message):
+    print(f"[{value:3d}%] {message}", flush=True)
+
+def run_from_config(path=None, api_key=None, run_id=None, output=None, progress=print_progress,
+                    format='csv', stream=False):
+    """Run the full pipeline without a UI and write the results to CSV or Parquet.
+
+    With stream the leads are written as they are enriched instead of ranked
+    at the end, and a resumed run appends to the file it was writing. The
+    checkpoint records which leads reached the file, so leads that were
+    still buffered when the run died are written on resume.
+    """
+    settings = load_settings(path)
+    api_key = api_key or os.environ.get('SERPER_API_KEY') or SERPER_API_KEY
+    run_id = run_id or new_run_id()
+    output = output or f"lead_generation_{run_id}.{format}"
+    if not stream:
+        run_id, companies = run_pipeline(settings, api_key, run_id=run_id, progress=progress)
+        return run_id, export_leads(companies, output, format)
+
+    filepath = os.path.join('results', output)
+    checkpoint = RunCheckpoint(run_id)
+    exporter = None
+    exported = set()
+    buffered = []
+    try:
+        for event in iter_pipeline(settings, api_key, run_id):
+            progress(event['progress'], event['message'])
+            if event['company'] is None:
+                continue
+            if exporter is None:
+                # A resume that restores enriched leads continues the file it
+                # was writing, a run that starts over rewrites it
+                exporter = StreamingExporter(filepath, format, append=event['restored'])
+                exported = checkpoint.exported_positions() if event['restored'] else set()
+            if event['restored'] and event['position'] in exported:
+                continue
+            rows_written = exporter.rows_written
+            exporter.write(event['company'])
+            buffered.append(event['position'])
+            if exporter.rows_written != rows_written:
+                # A chunk went to disk, everything buffered so far is in the file
+                checkpoint.mark_exported(buffered)
+                buffered = []
+    finally:
+        if exporter is not None:
+            exporter.close()
+            checkpoint.mark_exported(buffered)
+    return run_id, filepath
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the lead generation pipeline without the Streamlit UI")
+    parser.add_argument('--config', help="JSON file with pipeline settings (defaults come from config.py)")
+    parser.add_argument('--api-key', help="Search API key, defaults to $SERPER_API_KEY or config.SERPER_API_KEY")
+    parser.add_argument('--run-id', help="Resume an interrupted run")
+    parser.add_argument('--output', help="Filename written to results/")
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv', help="Export format (default: csv)")
+    parser.add_argument('--stream', action='store_true',
+                        help="Write leads as they are enriched (unranked), resumed runs append to the same file")
+    parser.add_argument('--metrics', help="Write the run's timings and counters to this file, "
+                                          "Prometheus text for .prom/.txt and JSON otherwise")
+    parser.add_argument('--list-runs', action='store_true', help="List checkpointed runs and exit")
+    args = parser.parse_args(argv)
+
+    if args.list_runs:
+        for run_id, status, _ in list_runs():
+            print(f"{run_id}\t{status}")
+        return 0
+
+    run_id = args.run_id or new_run_id()
+    try:
+        run_id, filepath = run_from_config(args.config, args.api_key, run_id, args.output,
+                                           format=args.format, stream=args.stream)
+    except KeyboardInterrupt:
+        print(f"Interrupted, resume with --run-id {run_id}", file=sys.stderr)
+        return 130
+    finally:
+        # Written after the export so its timings are included, also for interrupted runs
+        if args.metrics:
+            write_metrics(args.metrics)
+    print(f"Run {run_id} finished, results in {filepath}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,7 +7,86 @@ SERPER_API_KEY = "68edae654a881c2bdc42845207e8cdae5458be2d52aaa6b483c52b7b274ae0
 REQUEST_DELAY_MIN_SEC = 2
 REQUEST_DELAY_MAX_SEC = 5
 MAX_PAGES_PER_SEARCH = 5
+DIRECTORY_WORKERS = 8  # Directory pages fetched at once, across all directory URLs
 MAX_COMPANIES = 100
+ENRICHMENT_WORKERS = 4  # Companies enriched in parallel, 1 disables concurrency
+
+# Plain HTTP fetching, tried before rendering a page in Chrome
+HTTP_POOL_SIZE = 20
+HTTP_TIMEOUT_SEC = 15
+HTTP_USER_AGENT = "Mozilla/5.0 (compatible; LeadGenerationBot/1.0)"
+
+# Per-domain politeness, requests to different hosts don't wait on each other
+DOMAIN_RATE_PER_SEC = 1 / REQUEST_DELAY_MIN_SEC
+DOMAIN_BURST = 1
+DOMAIN_RATE_OVERRIDES = {
+    # domain: (requests per second, burst)
+    'serpapi.com': (5, 5),
+}
+RATE_LIMIT_DB_PATH = ".cache/rate_limits.sqlite"  # Job workers share their buckets here, concurrent jobs split a domain's rate
+
+# Search API
+SEARCH_WORKERS = 8
+SEARCH_MAX_PAGES = 25  # Result pages fetched per industry query
+SEARCH_MAX_RETRIES = 4
+SEARCH_BACKOFF_SEC = 1  # Exponential backoff base between retries
+
+# Selenium driver pool
+DRIVER_POOL_SIZE = ENRICHMENT_WORKERS
+DRIVER_MAX_PAGES = 50  # Recycle a browser after this many page loads
+DRIVER_CHECKOUT_TIMEOUT_SEC = 300
+
+# HTML parsing, done in worker processes so it doesn't hold the fetching threads' GIL
+PARSER_PROCESSES = None  # None uses one per core, 0 parses in the calling thread
+
+# Local caches
+CACHE_DB_PATH = ".cache/lead_generation.sqlite"
+SEARCH_CACHE_ENABLED = True
+SEARCH_CACHE_TTL_SEC = 7 * 24 * 3600
+SEARCH_CACHE_MAX_ENTRIES = 5000
+CRAWL_CACHE_ENABLED = True
+CRAWL_CACHE_TTL_SEC = 30 * 24 * 3600  # Fresh entries are served without a request
+CRAWL_CACHE_MAX_ENTRIES = 20000
+DIRECTORY_CACHE_TTL_SEC = 3600  # Directory listings gain companies and shift pages, they are revalidated sooner
+CHECKPOINT_DB_PATH = ".cache/runs.sqlite"
+PATH_MEMORY_NEGATIVE_TTL_SEC = 14 * 24 * 3600  # Skip sites with no team page for this long
+
+# Background jobs, pipeline runs queued in SQLite and picked up by worker processes
+JOB_QUEUE_DB_PATH = ".cache/jobs.sqlite"
+JOB_WORKERS = 2  # Worker processes started by the Streamlit app, i.e. runs that can go at once
+JOB_POLL_INTERVAL_SEC = 1  # How often an idle worker looks for a queued job
+JOB_STALE_AFTER_SEC = 600  # A running job without progress for this long is assumed dead and requeued
+
+# Lead store, every run's leads keyed by domain
+LEAD_STORE_DB_PATH = "results/leads.sqlite"
+LEAD_STORE_SKIP_ENRICHED = True  # Reuse stored job titles instead of enriching a company again
+LEAD_STORE_MAX_AGE_SEC = 30 * 24 * 3600  # Stored enrichments older than this are redone
+
+# Keyword matching for exclude filters and ranking, False restores plain substring matching
+KEYWORD_WHOLE_WORD = True
+
+# Deduplication before enrichment
+DEDUP_ENABLED = True
+DEDUP_NAME_SIMILARITY = 0.8  # Token Jaccard similarity at which two names are the same company
+DEDUP_MAX_BLOCK_SIZE = 50  # Name tokens shared by more companies than this are too common to compare on
+DEDUP_WINDOW = 25  # Companies held back while later duplicates can still be merged into them
+
+# Run metrics, timings are histograms with these bucket bounds in seconds
+METRICS_LATENCY_BUCKETS_SEC = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Export
+EXPORT_CHUNK_SIZE = 1000  # Rows buffered before each write, also the Parquet row group size
+
+# Ranking
+VECTORIZED_RANKING_MIN_LEADS = 1000  # Below this the plain loop is faster
+# Points per criterion, ranking criteria can override them with a 'weights' dict
+DEFAULT_RANKING_WEIGHTS = {
+    'industry': 30,  # Industry matches the target
+    'employees': 20,  # Employee count within the target range
+    'keyword': 5,  # Per keyword found in the description
+    'executive': 2,  # Per executive found
+    'max_executive': 10  # Cap on the executive points
+}
 
 # Default filters
 DEFAULT_FILTERS = {
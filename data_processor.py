@@ -1,45 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 from scraper import extract_job_titles
-import time
+from metrics import increment, timed
+from config import ENRICHMENT_WORKERS
 
-def enhance_company_data(companies):
-    """Add additional information to company data and convert job titles to Software Developer"""
+def enhance_company_data(companies, max_workers=ENRICHMENT_WORKERS, on_enhanced=None):
+    """Add additional information to company data and convert job titles to Software Developer.
+
+    on_enhanced(index, company) is called as each company finishes, which may
+    be out of order when running in parallel.
+    """
     enhanced_companies = []
     
-    for company in companies:
-        try:
-            # Extract job titles if website is available
-            if 'website' in company and company['website']:
-                # Get the original job titles
-                original_job_titles = extract_job_titles(company['website'])
-                
-                # Convert all job titles to "Software Developer"
-                if original_job_titles:
-                    company['job_titles'] = {name: "Software Developer" for name in original_job_titles.keys()}
-                else:
-                    # If no job titles were found, create some placeholder data
-                    company['job_titles'] = {
-                        f"Developer 1 at {company.get('name', 'Company')}": "Software Developer",
-                        f"Developer 2 at {company.get('name', 'Company')}": "Software Developer"
-                    }
+    for index, company, _ in iter_enhanced_companies(companies, max_workers):
+        if index >= len(enhanced_companies):
+            enhanced_companies.extend([None] * (index + 1 - len(enhanced_companies)))
+        enhanced_companies[index] = company
+        if on_enhanced:
+            on_enhanced(index, company)
+    
+    return enhanced_companies
+
+def iter_enhanced_companies(companies, max_workers=ENRICHMENT_WORKERS, lookup=None):
+    """Yield (index, company, reused) as soon as each company is enhanced.
+
+    companies can be any iterable and is consumed lazily, with at most a couple
+    of companies per worker in flight, so memory stays flat on long runs.
+    lookup(company) may return an already enhanced version of the company,
+    which is yielded straight away with reused set instead of being enhanced
+    again.
+    """
+    if max_workers <= 1:
+        for index, company in enumerate(companies):
+            known = lookup(company) if lookup else None
+            if known is not None:
+                increment('enrichments_reused_total')
+                yield index, known, True
+            else:
+                yield index, _enhance_company(company), False
+        return
+    
+    # Threads spend most of their time waiting on page loads
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+        for index, company in enumerate(companies):
+            known = lookup(company) if lookup else None
+            if known is not None:
+                increment('enrichments_reused_total')
+                yield index, known, True
+                continue
+            pending[executor.submit(_enhance_company, company)] = index
+            # Hand back whatever has finished, only block when too much is in flight
+            timeout = None if len(pending) >= max_workers * 2 else 0
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result(), False
+        
+        for future in as_completed(pending):
+            yield pending[future], future.result(), False
+
+@timed('enrichment_seconds')
+def _enhance_company(company):
+    try:
+        # Extract job titles if website is available
+        if 'website' in company and company['website']:
+            # Get the original job titles
+            original_job_titles = extract_job_titles(company['website'])
+            
+            # Convert all job titles to "Software Developer"
+            if original_job_titles:
+                company['job_titles'] = {name: "Software Developer" for name in original_job_titles.keys()}
             else:
-                # Create placeholder data if no website is available
+                # If no job titles were found, create some placeholder data
                 company['job_titles'] = {
                     f"Developer 1 at {company.get('name', 'Company')}": "Software Developer",
                     f"Developer 2 at {company.get('name', 'Company')}": "Software Developer"
                 }
-                
-            # Clean up and standardize data
-            if 'name' in company:
-                company['name'] = company['name'].strip()
-                
-            if 'industry' in company:
-                company['industry'] = company['industry'].strip().lower()
-                
-            enhanced_companies.append(company)
+        else:
+            # Create placeholder data if no website is available
+            company['job_titles'] = {
+                f"Developer 1 at {company.get('name', 'Company')}": "Software Developer",
+                f"Developer 2 at {company.get('name', 'Company')}": "Software Developer"
+            }
+            
+        # Clean up and standardize data
+        if 'name' in company:
+            company['name'] = company['name'].strip()
+            
+        if 'industry' in company:
+            company['industry'] = company['industry'].strip().lower()
             
-        except Exception as e:
-            print(f"Error enhancing data for {company.get('name', 'unknown company')}: {str(e)}")
-            # Still include the company even if enhancement fails
-            enhanced_companies.append(company)
+    except Exception as e:
+        print(f"Error enhancing data for {company.get('name', 'unknown company')}: {str(e)}")
+        increment('enrichment_failures_total')
+        # Still include the company even if enhancement fails
     
-    return enhanced_companies
\ No newline at end of file
+    return company
@@ -0,0 +1,187 @@
+# dedup.py
+
+import re
+from collections import defaultdict
+from metrics import Stopwatch, increment, observe
+from rate_limiter import domain_of
+from config import DEDUP_NAME_SIMILARITY, DEDUP_MAX_BLOCK_SIZE, DEDUP_WINDOW
+
+# Search result titles look like "Acme Corp - Home", "Acme | LinkedIn" or "Acme: About us"
+_TITLE_SEPARATORS = re.compile(r'\s+[-–—|:]\s+|\|')
+_TOKEN = re.compile(r'[a-z0-9]+')
+# Words that don't tell one company from another
+_NOISE_WORDS = frozenset({
+    'the', 'and', 'of', 'inc', 'llc', 'ltd', 'limited', 'corp', 'corporation', 'co',
+    'company', 'companies', 'group', 'gmbh', 'plc', 'sa', 'ag', 'home', 'official', 'site', 'website'
+})
+
+def name_tokens(name):
+    """Distinguishing words of a company name, frozen so they can be compared as sets"""
+    head = _TITLE_SEPARATORS.split(name or '', maxsplit=1)[0]
+    tokens = frozenset(token for token in _TOKEN.findall(head.lower()) if token not in _NOISE_WORDS)
+    # A name made only of noise words is still a name
+    return tokens or frozenset(_TOKEN.findall(head.lower()))
+
+def domain_key(website):
+    return domain_of(website) if website else ''
+
+def merge_leads(primary, duplicate):
+    """Fill the fields primary is missing from duplicate, job titles are combined"""
+    for key, value in duplicate.items():
+        if key == 'job_titles' and isinstance(value, dict) and isinstance(primary.get(key), dict):
+            primary[key] = {**value, **primary[key]}
+        elif value and not primary.get(key):
+            primary[key] = value
+    return primary
+
+
+class DedupIndex:
+    """Entity resolution index over leads seen so far.
+
+    Leads are the same company when they share a normalized domain, or when
+    their names are at least DEDUP_NAME_SIMILARITY similar (token Jaccard).
+    Names are only compared against leads sharing a name token (blocking), so
+    each lead is checked against a handful of candidates instead of all of
+    them. Matches are merged with union-find, so a lead that links two
+    earlier clusters joins them into one. absorbed_roots lists the clusters
+    the last add() joined into another one.
+    """
+
+    def __init__(self, name_similarity=DEDUP_NAME_SIMILARITY, max_block_size=DEDUP_MAX_BLOCK_SIZE):
+        self.name_similarity = name_similarity
+        self.max_block_size = max_block_size
+        self.leads = []
+        self._parent = []
+        self._tokens = []
+        self._by_domain = {}
+        self._by_token = defaultdict(list)
+        self.absorbed_roots = []
+
+    def __len__(self):
+        return len(self.leads)
+
+    def find(self, index):
+        """Cluster root of a lead, with path halving"""
+        parent = self._parent
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    def _union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            # The earliest lead stays the cluster root
+            first, second = min(first, second), max(first, second)
+            self._parent[second] = first
+        return first
+
+    def _similar_names(self, tokens):
+        overlap = defaultdict(int)
+        for token in tokens:
+            block = self._by_token.get(token, ())
+            if len(block) > self.max_block_size:
+                continue
+            for candidate in block:
+                overlap[candidate] += 1
+        for candidate, shared in overlap.items():
+            union_size = len(tokens) + len(self._tokens[candidate]) - shared
+            if shared / union_size >= self.name_similarity:
+                yield candidate
+
+    def add(self, lead):
+        """Index a lead and return (root lead index, True if it is a new company)"""
+        index = len(self.leads)
+        self.leads.append(lead)
+        self._parent.append(index)
+        tokens = name_tokens(lead.get('name'))
+        self._tokens.append(tokens)
+
+        matches = set(self._similar_names(tokens)) if tokens else set()
+        domain = domain_key(lead.get('website'))
+        if domain:
+            if domain in self._by_domain:
+                matches.add(self._by_domain[domain])
+            else:
+                self._by_domain[domain] = index
+
+        for token in tokens:
+            block = self._by_token[token]
+            # Past the cap a block is never compared on, stop growing it
+            if len(block) <= self.max_block_size:
+                block.append(index)
+
+        roots = {self.find(match) for match in matches}
+        root = index
+        for match in roots:
+            root = self._union(root, match)
+        self.absorbed_roots = sorted(other for other in roots if other != root)
+        return root, not matches
+
+    def clusters(self):
+        """Lead indexes grouped by company, in order of first appearance"""
+        groups = defaultdict(list)
+        for index in range(len(self.leads)):
+            groups[self.find(index)].append(index)
+        return [groups[root] for root in sorted(groups)]
+
+
+def deduplicate_companies(companies, name_similarity=DEDUP_NAME_SIMILARITY):
+    """One merged lead per company, in order of first appearance"""
+    index = DedupIndex(name_similarity)
+    for company in companies:
+        index.add(company)
+
+    merged = []
+    for cluster in index.clusters():
+        primary = index.leads[cluster[0]]
+        for position in cluster[1:]:
+            merge_leads(primary, index.leads[position])
+        merged.append(primary)
+    return merged
+
+def iter_deduplicated(companies, name_similarity=DEDUP_NAME_SIMILARITY, stats=None, window=DEDUP_WINDOW):
+    """Lazily yield one merged lead per company, in order of first appearance.
+
+    A new company is held back until window more companies have been seen,
+    duplicates arriving in that time are merged into it before it is
+    yielded. Once yielded a lead is never changed, it may already be
+    checkpointed or being enriched, so a later duplicate of it is dropped
+    unmerged. stats, when given, counts the dropped duplicates under
+    'duplicates'.
+    """
+    index = DedupIndex(name_similarity)
+    # Cluster roots not yielded yet, oldest first
+    pending = {}
+    dropped = 0
+    # Only the matching is timed, not the stages feeding or consuming it
+    stopwatch = Stopwatch()
+    try:
+        for company in companies:
+            with stopwatch:
+                root, is_new = index.add(company)
+                if is_new:
+                    pending[root] = company
+                else:
+                    # Earlier clusters this lead showed to be the same company, merged first
+                    # since the fields of earlier leads win
+                    for absorbed in index.absorbed_roots:
+                        lead = pending.pop(absorbed, None)
+                        if lead is not None:
+                            dropped += 1
+                            if root in pending:
+                                merge_leads(pending[root], lead)
+                    dropped += 1
+                    if root in pending:
+                        merge_leads(pending[root], company)
+            if dropped:
+                increment('duplicates_merged_total', dropped)
+                if stats is not None:
+                    stats['duplicates'] = stats.get('duplicates', 0) + dropped
+                dropped = 0
+            while len(pending) > window:
+                yield pending.pop(next(iter(pending)))
+        while pending:
+            yield pending.pop(next(iter(pending)))
+    finally:
+        observe('stage_seconds', stopwatch.elapsed, stage='dedup')
@@ -0,0 +1,154 @@
+# driver_pool.py
+
+import atexit
+import queue
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+from config import DRIVER_POOL_SIZE, DRIVER_MAX_PAGES, DRIVER_CHECKOUT_TIMEOUT_SEC
+from metrics import increment, timer
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+def get_driver_path():
+    """Resolve the chromedriver binary once per process"""
+    global _driver_path
+    if _driver_path is None:
+        with _driver_path_lock:
+            if _driver_path is None:
+                _driver_path = ChromeDriverManager().install()
+    return _driver_path
+
+def create_driver():
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    return webdriver.Chrome(service=Service(get_driver_path()), options=options)
+
+
+class PooledDriver:
+    """A driver checked out of the pool, counting the pages it has loaded"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages_loaded = 0
+        self.broken = False
+
+    def get(self, url):
+        self.pages_loaded += 1
+        try:
+            self.driver.get(url)
+        except Exception:
+            # Navigation errors are common on bad sites, only a dead
+            # browser should force a recycle
+            if not self.is_healthy():
+                self.broken = True
+            raise
+
+    @property
+    def page_source(self):
+        return self.driver.page_source
+
+    def is_healthy(self):
+        try:
+            self.driver.current_url
+            return True
+        except Exception:
+            return False
+
+
+class DriverPool:
+    """Bounded pool of headless Chrome drivers shared across scraping calls"""
+
+    def __init__(self, size=DRIVER_POOL_SIZE, max_pages=DRIVER_MAX_PAGES):
+        self.size = size
+        self.max_pages = max_pages
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @contextmanager
+    def driver(self, timeout=DRIVER_CHECKOUT_TIMEOUT_SEC):
+        """Check out a driver for the duration of the block"""
+        pooled = self.checkout(timeout)
+        try:
+            yield pooled
+        except Exception:
+            if not pooled.is_healthy():
+                pooled.broken = True
+            raise
+        finally:
+            self.checkin(pooled)
+
+    def checkout(self, timeout=DRIVER_CHECKOUT_TIMEOUT_SEC):
+        if self._closed:
+            raise RuntimeError("Driver pool is closed")
+        with timer('driver_checkout_wait_seconds'):
+            acquired = self._slots.acquire(timeout=timeout)
+        if not acquired:
+            raise TimeoutError(f"No driver available after {timeout}s")
+        try:
+            while True:
+                try:
+                    pooled = self._idle.get_nowait()
+                except queue.Empty:
+                    with timer('driver_start_seconds'):
+                        return PooledDriver(create_driver())
+                if pooled.is_healthy():
+                    return pooled
+                self._quit(pooled)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def checkin(self, pooled):
+        try:
+            if self._closed or pooled.broken or pooled.pages_loaded >= self.max_pages:
+                if not self._closed:
+                    increment('drivers_replaced_total', reason='broken' if pooled.broken else 'max_pages')
+                self._quit(pooled)
+            else:
+                self._idle.put(pooled)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def _quit(self, pooled):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            print(f"Error closing driver: {str(e)}")
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_driver_pool():
+    """Return the process-wide driver pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = DriverPool()
+                atexit.register(shutdown_driver_pool)
+    return _pool
+
+def shutdown_driver_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
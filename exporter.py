@@ -1,41 +1,157 @@
 # exporter.py
 
-import pandas as pd
+import csv
+import glob
 import os
 import datetime
+import uuid
+from lead import FIELDS, format_job_titles
+from metrics import increment, timer
+from config import EXPORT_CHUNK_SIZE
 
-def export_to_csv(companies, filename=None):
-    """Export companies data to CSV file"""
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+EXPORT_FORMATS = ('csv', 'parquet')
+
+
+def export_row(company, columns=FIELDS):
+    """One lead as a flat row: missing fields are None, job titles are text"""
+    row = {column: company.get(column) for column in columns}
+    if 'job_titles' in row:
+        row['job_titles'] = format_job_titles(row['job_titles'])
+    return row
+
+
+class StreamingExporter:
+    """Writes leads to CSV or Parquet in chunks as they arrive.
+
+    Only one chunk of rows is held in memory at a time. With append=True an
+    existing export is extended instead of replaced, which is what a resumed
+    run wants. CSV appends reuse the columns of the existing header. A Parquet
+    export is a directory of part files (one per exporter, a row group per
+    chunk) that pandas.read_parquet reads as a single table.
+    """
+
+    def __init__(self, filepath, format='csv', append=False, columns=FIELDS, chunk_size=EXPORT_CHUNK_SIZE):
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {format!r}, expected one of {EXPORT_FORMATS}")
+        if format == 'parquet' and pa is None:
+            raise ImportError("Parquet export needs the pyarrow package")
+        self.filepath = filepath
+        self.format = format
+        self.append = append
+        self.columns = tuple(columns)
+        self.chunk_size = chunk_size
+        self.rows_written = 0
+        self._rows = []
+        self._file = None
+        self._writer = None
+
+        if format == 'csv':
+            self._open_csv()
+        else:
+            self._open_parquet()
+
+    def _open_csv(self):
+        os.makedirs(os.path.dirname(self.filepath) or '.', exist_ok=True)
+        existing = self.append and os.path.exists(self.filepath) and os.path.getsize(self.filepath) > 0
+        if existing:
+            with open(self.filepath, newline='', encoding='utf-8') as f:
+                self.columns = tuple(next(csv.reader(f)))
+        self._file = open(self.filepath, 'a' if existing else 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, extrasaction='ignore')
+        if not existing:
+            self._writer.writeheader()
+
+    def _open_parquet(self):
+        os.makedirs(self.filepath, exist_ok=True)
+        if not self.append:
+            for part in glob.glob(os.path.join(self.filepath, '*.parquet')):
+                os.remove(part)
+        # Scores are fractional under fractional ranking weights, every part gets the same type
+        self._schema = pa.schema([
+            (column, pa.float64() if column == 'relevance_score' else pa.string()) for column in self.columns
+        ])
+        # Part names sort in the order they were written
+        part = f"part-{datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')}-{uuid.uuid4().hex[:6]}.parquet"
+        self._part_path = os.path.join(self.filepath, part)
+
+    def write(self, company):
+        self._rows.append(export_row(company, self.columns))
+        if len(self._rows) >= self.chunk_size:
+            self.flush()
+
+    def write_many(self, companies):
+        for company in companies:
+            self.write(company)
+
+    def flush(self):
+        if not self._rows:
+            return
+        with timer('export_flush_seconds', format=self.format):
+            if self.format == 'csv':
+                self._writer.writerows(self._rows)
+                self._file.flush()
+            else:
+                self._write_parquet_chunk(self._rows)
+        increment('exported_rows_total', len(self._rows), format=self.format)
+        self.rows_written += len(self._rows)
+        self._rows = []
+
+    def _write_parquet_chunk(self, rows):
+        arrays = []
+        for field in self._schema:
+            values = [row[field.name] for row in rows]
+            if pa.types.is_string(field.type):
+                values = [None if value is None else str(value) for value in values]
+            arrays.append(pa.array(values, type=field.type))
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self._part_path, self._schema, compression='snappy')
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self):
+        self.flush()
+        if self._writer is not None and self.format == 'parquet':
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+        self._writer = self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def export_leads(companies, filename=None, format='csv', append=False):
+    """Stream companies to results/<filename> and return the path written"""
     if not filename:
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"lead_generation_results_{timestamp}.csv"
-    
-    # Flatten job titles for CSV
-    flattened_companies = []
-    for company in companies:
-        company_copy = company.copy()
-        
-        # Convert dict of job titles to string
-        if 'job_titles' in company_copy and isinstance(company_copy['job_titles'], dict):
-            job_titles_str = "; ".join([f"{name}: {title}" for name, title in company_copy['job_titles'].items()])
-            company_copy['job_titles'] = job_titles_str
-            
-        flattened_companies.append(company_copy)
-    
-    df = pd.DataFrame(flattened_companies)
-    
-    # Create directory if it doesn't exist
-    os.makedirs('results', exist_ok=True)
+        filename = f"lead_generation_results_{timestamp}.{format}"
+
     filepath = os.path.join('results', filename)
-    
-    df.to_csv(filepath, index=False)
-    print(f"Results exported to {filepath}")
+    with StreamingExporter(filepath, format, append=append) as exporter:
+        exporter.write_many(companies)
+    print(f"Results exported to {filepath} ({exporter.rows_written} rows)")
     return filepath
 
+def export_to_csv(companies, filename=None, append=False):
+    """Export companies data to CSV file"""
+    return export_leads(companies, filename, 'csv', append)
+
+def export_to_parquet(companies, filename=None, append=False):
+    """Export companies data to a Parquet dataset directory"""
+    return export_leads(companies, filename, 'parquet', append)
+
 def export_to_google_sheets(companies, sheet_name=None):
     """Export companies data to Google Sheets"""
     # This would require Google Sheets API setup
     # For now, just note that this would be implemented here
     print("Google Sheets export would be implemented here")
     print("This requires setting up OAuth2 credentials for Google Sheets API")
-    return None
\ No newline at end of file
+    return None
@@ -0,0 +1,139 @@
+# fetcher.py
+
+import re
+import requests
+from requests.adapters import HTTPAdapter
+from cache import get_crawl_cache
+from config import HTTP_POOL_SIZE, HTTP_TIMEOUT_SEC, HTTP_USER_AGENT, CRAWL_CACHE_ENABLED
+from driver_pool import get_driver_pool
+from metrics import counter_value, increment, timer
+from parsing import run_parser
+from rate_limiter import wait_for_slot
+
+_session = requests.Session()
+_session.headers.update({'User-Agent': HTTP_USER_AGENT})
+_adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+_session.mount('http://', _adapter)
+_session.mount('https://', _adapter)
+
+_TIERS = ('cache', 'revalidated', 'missing', 'http', 'selenium')
+
+# Empty mount points used by client-side rendered apps
+_APP_ROOT = re.compile(r'<div[^>]+id=["\'](root|app|__next|__nuxt)["\'][^>]*>\s*</div>', re.I)
+_SCRIPT_OR_STYLE = re.compile(r'<(script|style|noscript)\b.*?</\1>', re.I | re.S)
+_TAG = re.compile(r'<[^>]+>')
+# Refusals that are usually aimed at the bot user agent, a browser tends to get through
+_BLOCKED_STATUSES = (401, 403, 406)
+
+def get_session():
+    return _session
+
+def get_tier_stats():
+    """Pages served by each tier since the metrics were last reset"""
+    return {tier: counter_value('pages_fetched_total', tier=tier) for tier in _TIERS}
+
+def _record(tier):
+    increment('pages_fetched_total', tier=tier)
+
+def looks_js_rendered(html):
+    if _APP_ROOT.search(html):
+        return True
+    visible_text = _TAG.sub(' ', _SCRIPT_OR_STYLE.sub(' ', html))
+    return len(visible_text.split()) < 50
+
+class FetchError(Exception):
+    """The server failed to answer (5xx or 429), worth retrying later but not in Chrome"""
+
+
+def fetch_static(url, cached=None):
+    """Plain HTTP fetch, revalidating against a cached entry when one is given.
+
+    Returns (html, etag, last_modified, outcome). outcome is 'ok',
+    'not_modified', 'blocked' when the server refused the request (401, 403,
+    406), 'missing' for a response a browser wouldn't do better with (404,
+    410, other client errors, non-HTML) or 'error' when the request itself
+    failed. Server errors raise FetchError.
+    """
+    headers = {}
+    if cached:
+        if cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+    try:
+        wait_for_slot(url)
+        with timer('page_fetch_seconds', tier='http'):
+            response = _session.get(url, headers=headers, timeout=HTTP_TIMEOUT_SEC)
+    except requests.exceptions.RequestException as e:
+        increment('page_fetch_failures_total', tier='http', reason=type(e).__name__)
+        return None, None, None, 'error'
+
+    if response.status_code == 304 and cached:
+        return None, None, None, 'not_modified'
+    if response.status_code != 200 or 'html' not in response.headers.get('Content-Type', ''):
+        reason = 'not_html' if response.status_code == 200 else str(response.status_code)
+        increment('page_fetch_failures_total', tier='http', reason=reason)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise FetchError(f"{url} answered {response.status_code}")
+        if response.status_code in _BLOCKED_STATUSES:
+            return None, None, None, 'blocked'
+        return None, None, None, 'missing'
+    return response.text, response.headers.get('ETag'), response.headers.get('Last-Modified'), 'ok'
+
+def fetch_rendered(url):
+    # Wait for the domain's slot first, so no browser sits idle through the delay
+    wait_for_slot(url)
+    with get_driver_pool().driver() as driver:
+        try:
+            with timer('page_fetch_seconds', tier='selenium'):
+                driver.get(url)
+                return driver.page_source
+        except Exception as e:
+            increment('page_fetch_failures_total', tier='selenium', reason=type(e).__name__)
+            raise
+
+def fetch_and_parse(url, parse, use_cache=CRAWL_CACHE_ENABLED, max_age=None):
+    """Parse the page as served and only render it in Chrome when that finds nothing.
+
+    The page is rendered once in a headless browser when the plain request
+    failed to connect or was refused, the HTML looks client-side rendered or
+    parsing it found nothing (e.g. a team section injected by JavaScript).
+    A missing page (404, 410, ...) is a definitive miss and returns parse's
+    empty result without a browser. parse(html) runs in the parse pool, so
+    it must be a module-level function and return an empty value when the
+    page has nothing useful. Results are cached per URL and parse function;
+    fresh entries skip the network and stale ones are revalidated with
+    ETag/Last-Modified. max_age overrides CRAWL_CACHE_TTL_SEC for pages
+    that change more often.
+    """
+    kind = parse.__name__
+    cached = get_crawl_cache().get(url, kind, max_age) if use_cache else None
+    if cached and cached['fresh']:
+        _record('cache')
+        return cached['result']
+
+    html, etag, last_modified, outcome = fetch_static(url, cached)
+    if outcome == 'not_modified':
+        get_crawl_cache().revalidated(url, kind)
+        _record('revalidated')
+        return cached['result']
+    if outcome == 'missing':
+        _record('missing')
+        return parse('')
+
+    if outcome == 'ok' and not looks_js_rendered(html):
+        result = run_parser(parse, html)
+        if result:
+            _record('http')
+            if use_cache:
+                get_crawl_cache().set(url, kind, html, result, etag, last_modified)
+            return result
+
+    html = fetch_rendered(url)
+    _record('selenium')
+    result = run_parser(parse, html)
+    if use_cache:
+        # No validators here, the rendered DOM doesn't match what the server sends.
+        # Empty results are cached too, so the page isn't rendered again until it expires
+        get_crawl_cache().set(url, kind, html, result)
+    return result
@@ -1,51 +1,172 @@
 # filters.py
 
-def apply_pre_scraping_filters(companies, filters):
-    if not filters:
-        return companies
-        
-    filtered_companies = []
-    
-    for company in companies:
+import re
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from keyword_matcher import get_keyword_matcher
+from metrics import Stopwatch, increment, observe
+
+
+class FilterPlan(namedtuple('FilterPlan', ['min_employees', 'industries', 'exclude_keywords'])):
+    """A filters dict compiled once: lowered industry set, keyword matcher, parsed thresholds"""
+    __slots__ = ()
+
+    @property
+    def matcher(self):
+        return get_keyword_matcher(self.exclude_keywords)
+
+    def matches(self, company):
         # Skip if doesn't meet employee count requirement
-        if filters.get('min_employees') and company.get('employee_count'):
-            try:
-                emp_count = parse_employee_count(company.get('employee_count', '0'))
-                if emp_count < filters.get('min_employees'):
-                    continue
-            except:
-                pass
-            
+        if self.min_employees and company.get('employee_count'):
+            if parse_employee_count(company.get('employee_count')) < self.min_employees:
+                return False
+
         # Skip if industry doesn't match
-        if filters.get('industries') and company.get('industry'):
-            if company.get('industry').lower() not in [ind.lower() for ind in filters.get('industries')]:
-                continue
-            
+        if self.industries and company.get('industry'):
+            if company.get('industry').lower() not in self.industries:
+                return False
+
         # Skip if contains excluded keywords
-        if filters.get('exclude_keywords'):
-            should_exclude = False
-            description = company.get('description', '').lower()
-            for keyword in filters.get('exclude_keywords'):
-                if keyword.lower() in description:
-                    should_exclude = True
-                    break
-            if should_exclude:
-                continue
-        
-        filtered_companies.append(company)
-    
-    return filtered_companies
+        if self.exclude_keywords and self.matcher.search(company.get('description', '')):
+            return False
 
-def parse_employee_count(emp_count_str):
-    # Handle various formats like "100-500", "1,000+", etc.
+        return True
+
+    def mask(self, df):
+        """Boolean array of the DataFrame rows that pass, evaluated column-wise"""
+        keep = np.ones(len(df), dtype=bool)
+
+        if self.min_employees and 'employee_count' in df:
+            # Missing counts pass like in matches(), unparseable ones count as 0
+            present = df['employee_count'].fillna('').astype(str).to_numpy() != ''
+            lower_bounds, _ = parse_employee_ranges(df['employee_count'])
+            keep &= ~present | (np.nan_to_num(lower_bounds, nan=0) >= self.min_employees)
+
+        if self.industries and 'industry' in df:
+            industries = df['industry'].fillna('').astype(str)
+            keep &= map_distinct(industries, lambda industry: not industry or industry.lower() in self.industries).astype(bool)
+
+        if self.exclude_keywords and 'description' in df:
+            keep &= self.matcher.hit_counts(df['description'].fillna('').astype(str).tolist()) == 0
+
+        return keep
+
+
+def compile_filters(filters):
+    """Turn a filters dict into a reusable, hashable FilterPlan (None when there is nothing to filter)"""
+    if not filters:
+        return None
+    return _compile(
+        filters.get('min_employees') or 0,
+        tuple(filters.get('industries') or ()),
+        tuple(filters.get('exclude_keywords') or ())
+    )
+
+@lru_cache(maxsize=64)
+def _compile(min_employees, industries, exclude_keywords):
+    return FilterPlan(
+        min_employees,
+        frozenset(industry.lower() for industry in industries),
+        tuple(keyword for keyword in exclude_keywords if keyword)
+    )
+
+def apply_pre_scraping_filters(companies, filters):
+    if not filters:
+        return companies
+
+    return list(iter_pre_scraping_filters(companies, filters))
+
+def iter_pre_scraping_filters(companies, filters):
+    """Lazily yield the companies that pass the filters"""
+    plan = compile_filters(filters)
+    if plan is None:
+        yield from companies
+        return
+
+    stopwatch = Stopwatch()
     try:
-        emp_count_str = emp_count_str.lower().replace('employees', '').strip()
-        if '-' in emp_count_str:
-            return int(emp_count_str.split('-')[0].replace(',', '').strip())
-        elif '+' in emp_count_str:
-            return int(emp_count_str.replace('+', '').replace(',', '').strip())
-        else:
-            return int(emp_count_str.replace(',', '').strip())
-    except Exception as e:
-        print(f"Error parsing employee count '{emp_count_str}': {str(e)}")
-        return 0
+        for company in companies:
+            with stopwatch:
+                passed = plan.matches(company)
+            increment('filtered_companies_total', outcome='passed' if passed else 'rejected')
+            if passed:
+                yield company
+    finally:
+        observe('stage_seconds', stopwatch.elapsed, stage='filter')
+
+def filter_dataframe(df, filters):
+    """Batch mode of apply_pre_scraping_filters for directory data held in a DataFrame"""
+    plan = compile_filters(filters)
+    if plan is None:
+        return df
+    return df[plan.mask(df)]
+
+def map_distinct(series, func):
+    """Apply func once per distinct value and broadcast the results back"""
+    codes, uniques = pd.factorize(series)
+    return np.asarray([func(value) for value in uniques])[codes] if len(uniques) else np.zeros(0, dtype=np.int64)
+
+# "100-500", "51–200 employees", "10,001+", "1k", "1.5K - 5K staff"
+_NUMBER = r'(\d[\d,]*(?:\.\d+)?)\s*([km])?'
+_EMPLOYEE_RANGE = re.compile(
+    rf'^\s*{_NUMBER}\s*(?:(?:-|–|—|to)\s*{_NUMBER}|(\+))?\s*(?:employees?|staff|people)?\s*$',
+    re.IGNORECASE
+)
+_MULTIPLIERS = {None: 1, 'k': 1000, 'm': 1000000}
+
+def _number(text):
+    return float(text.replace(',', ''))
+
+def _to_count(number, suffix):
+    return int(_number(number) * _MULTIPLIERS[suffix and suffix.lower()])
+
+@lru_cache(maxsize=65536)
+def parse_employee_range(emp_count_str):
+    """Parse an employee count into a (low, high) range.
+
+    high is None for open-ended counts like "1,000+". Returns None when the
+    value can't be parsed. Results are memoized, so the same directory string
+    is only parsed once per process however many stages look at it.
+    """
+    if not isinstance(emp_count_str, str):
+        return None
+    match = _EMPLOYEE_RANGE.match(emp_count_str)
+    if not match:
+        return None
+    low_number, low_suffix, high_number, high_suffix, open_ended = match.groups()
+    low = _to_count(low_number, low_suffix)
+    if open_ended:
+        return low, None
+    if high_number:
+        high = _to_count(high_number, high_suffix)
+        # "1-5k" means 1,000-5,000, but "501-1K" means 501-1,000: the low end
+        # only takes the suffix when its bare number is below the high end's.
+        # The bare numbers are compared unrounded, so "1.2-1.8k" is 1,200-1,800
+        if not low_suffix and high_suffix and _number(low_number) < _number(high_number):
+            low = _to_count(low_number, high_suffix)
+        return low, high
+    return low, low
+
+def parse_employee_ranges(values):
+    """Vectorized parse_employee_range for a column of values.
+
+    Returns (low, high) float arrays, NaN where a value can't be parsed and
+    inf as the upper bound of open-ended counts. Each distinct value is parsed once.
+    """
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    lows = np.full(len(uniques) + 1, np.nan)
+    highs = np.full(len(uniques) + 1, np.nan)
+    for index, value in enumerate(uniques):
+        parsed = parse_employee_range(value)
+        if parsed:
+            lows[index] = parsed[0]
+            highs[index] = np.inf if parsed[1] is None else parsed[1]
+    # Missing values get code -1, which picks the trailing NaN
+    return lows[codes], highs[codes]
+
+def parse_employee_count(emp_count_str):
+    """Lower bound of an employee count, 0 when it can't be parsed"""
+    parsed = parse_employee_range(emp_count_str)
+    return parsed[0] if parsed else 0
@@ -0,0 +1,290 @@
+# job_queue.py
+
+import argparse
+import atexit
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+import uuid
+from cache import connect
+from checkpoint import new_run_id
+from fetcher import get_tier_stats
+from parsing import shutdown_parse_pool
+from pipeline import RunTakenOver, iter_pipeline
+from rate_limiter import share_rate_limits
+from config import SERPER_API_KEY, JOB_QUEUE_DB_PATH, JOB_WORKERS, JOB_POLL_INTERVAL_SEC, JOB_STALE_AFTER_SEC
+
+# Progress is written at most this often, stage changes and the end always are
+_PROGRESS_INTERVAL_SEC = 1
+FINISHED_STATUSES = ('complete', 'failed', 'cancelled')
+
+_schema_lock = threading.Lock()
+
+
+class JobLost(Exception):
+    """The job was requeued and claimed again, this worker no longer owns it"""
+
+
+def _open(path=JOB_QUEUE_DB_PATH):
+    conn = connect(path)
+    # Claims are made with explicit transactions
+    conn.isolation_level = None
+    with _schema_lock:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                settings TEXT NOT NULL,
+                api_key TEXT,
+                status TEXT NOT NULL,
+                progress INTEGER NOT NULL DEFAULT 0,
+                message TEXT,
+                error TEXT,
+                worker_pid INTEGER,
+                claim_token TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                heartbeat_at REAL,
+                finished_at REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+        # Queues created before claims were tokened
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if 'claim_token' not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN claim_token TEXT")
+    return conn
+
+def _as_dict(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)} if row else None
+
+_JOB_COLUMNS = "job_id, settings, status, progress, message, error, worker_pid, cancel_requested, created_at, started_at, finished_at"
+
+def submit_job(settings, api_key=None, run_id=None, path=JOB_QUEUE_DB_PATH):
+    """Queue a pipeline run and return its job id, which is also the run id.
+
+    Submitting the run id of an interrupted run queues its resume. The API
+    key is only stored until a worker claims the job.
+    """
+    job_id = run_id or new_run_id()
+    conn = _open(path)
+    try:
+        conn.execute(f"""
+            INSERT INTO jobs (job_id, settings, api_key, status, message, created_at)
+            VALUES (?, ?, ?, 'queued', 'Waiting for a worker', ?)
+            ON CONFLICT (job_id) DO UPDATE SET
+                api_key = excluded.api_key, status = 'queued', message = excluded.message, error = NULL,
+                cancel_requested = 0, finished_at = NULL
+            WHERE status IN {FINISHED_STATUSES}
+        """, (job_id, json.dumps(settings), api_key, time.time()))
+    finally:
+        conn.close()
+    return job_id
+
+def get_job(job_id, path=JOB_QUEUE_DB_PATH):
+    conn = _open(path)
+    try:
+        cursor = conn.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,))
+        job = _as_dict(cursor, cursor.fetchone())
+    finally:
+        conn.close()
+    if job:
+        job['settings'] = json.loads(job['settings'])
+    return job
+
+def list_jobs(limit=50, path=JOB_QUEUE_DB_PATH):
+    """Most recent jobs first as dicts, without their settings"""
+    conn = _open(path)
+    try:
+        cursor = conn.execute(
+            "SELECT job_id, status, progress, message, created_at, finished_at FROM jobs ORDER BY created_at DESC LIMIT ?",
+            (limit,)
+        )
+        return [_as_dict(cursor, row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def cancel_job(job_id, path=JOB_QUEUE_DB_PATH):
+    """Cancel a queued job, or ask the worker running it to stop after the current company"""
+    conn = _open(path)
+    try:
+        conn.execute("""
+            UPDATE jobs SET
+                cancel_requested = 1,
+                status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END,
+                finished_at = CASE WHEN status = 'queued' THEN ? ELSE finished_at END
+            WHERE job_id = ? AND status IN ('queued', 'running')
+        """, (time.time(), job_id))
+    finally:
+        conn.close()
+
+def claim_next_job(conn, worker_pid=None):
+    """Atomically take the oldest queued job, returns it with its API key and claim token or None.
+
+    Running jobs whose worker stopped reporting for JOB_STALE_AFTER_SEC are
+    put back in the queue first, they resume from their checkpoints. The
+    claim token changes with every claim, so a worker that was only slow
+    finds out at its next report that it no longer owns the job. The API
+    key is removed from the table as the job is claimed.
+    """
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "UPDATE jobs SET status = 'queued', claim_token = NULL, "
+            "message = 'Requeued after its worker stopped responding' "
+            "WHERE status = 'running' AND heartbeat_at < ?",
+            (now - JOB_STALE_AFTER_SEC,)
+        )
+        cursor = conn.execute(
+            "SELECT job_id, settings, api_key FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+        )
+        job = _as_dict(cursor, cursor.fetchone())
+        if job:
+            job['claim_token'] = uuid.uuid4().hex
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker_pid = ?, claim_token = ?, api_key = NULL, "
+                "started_at = ?, heartbeat_at = ?, message = 'Starting' WHERE job_id = ?",
+                (worker_pid or os.getpid(), job['claim_token'], now, now, job['job_id'])
+            )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    if job:
+        job['settings'] = json.loads(job['settings'])
+    return job
+
+def _report(conn, job, progress, message):
+    """Save progress and return True when the job was asked to stop.
+
+    Raises JobLost when the job was claimed by another worker since.
+    """
+    updated = conn.execute(
+        "UPDATE jobs SET progress = ?, message = ?, heartbeat_at = ? WHERE job_id = ? AND claim_token = ?",
+        (progress, message, time.time(), job['job_id'], job['claim_token'])
+    ).rowcount
+    if not updated:
+        raise JobLost(job['job_id'])
+    return conn.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job['job_id'],)).fetchone()[0] == 1
+
+def _finish(conn, job, status, message=None, error=None):
+    # A worker that lost the job leaves its row to the new owner
+    conn.execute(
+        "UPDATE jobs SET status = ?, message = COALESCE(?, message), error = ?, api_key = NULL, finished_at = ? "
+        "WHERE job_id = ? AND claim_token = ?",
+        (status, message, error, time.time(), job['job_id'], job['claim_token'])
+    )
+
+def run_job(conn, job):
+    """Run one claimed job to the end, the pipeline checkpoints it under the job id.
+
+    A job requeued after its worker died has no API key left, it falls back
+    to $SERPER_API_KEY or config.SERPER_API_KEY.
+    """
+    job_id = job['job_id']
+    api_key = job['api_key'] or os.environ.get('SERPER_API_KEY') or SERPER_API_KEY
+    last_report = 0
+    stage = None
+    events = iter_pipeline(job['settings'], api_key, run_id=job_id)
+    try:
+        for event in events:
+            now = time.monotonic()
+            if event['stage'] == stage and now - last_report < _PROGRESS_INTERVAL_SEC:
+                continue
+            stage, last_report = event['stage'], now
+            if _report(conn, job, event['progress'], event['message']):
+                # Closing the pipeline marks the run interrupted, it can be resumed later
+                events.close()
+                _finish(conn, job, 'cancelled', "Cancelled, resume it to continue")
+                return
+    except JobLost:
+        # Stop without marking the run interrupted, the new owner is running it
+        try:
+            events.throw(RunTakenOver(job_id))
+        except (RunTakenOver, StopIteration):
+            pass
+        print(f"Job {job_id} was taken over by another worker, stopping")
+        return
+    except Exception as e:
+        print(f"Job {job_id} failed: {str(e)}")
+        _finish(conn, job, 'failed', error=str(e))
+        return
+
+    stats = get_tier_stats()
+    _finish(conn, job, 'complete', f"{event['message']} Pages: {stats['cache'] + stats['revalidated']} from cache, "
+                                      f"{stats['http']} via HTTP, {stats['selenium']} via headless Chrome, "
+                                      f"{stats['missing']} missing")
+
+def run_worker(path=JOB_QUEUE_DB_PATH, poll_interval=JOB_POLL_INTERVAL_SEC, max_jobs=None):
+    """Run queued jobs one after another until max_jobs have run (forever without it)"""
+    # Jobs running side by side still keep to one rate per domain
+    share_rate_limits()
+    conn = _open(path)
+    finished = 0
+    try:
+        while max_jobs is None or finished < max_jobs:
+            job = claim_next_job(conn)
+            if job is None:
+                time.sleep(poll_interval)
+                continue
+            run_job(conn, job)
+            finished += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+        shutdown_parse_pool()
+
+def _stop(signum, frame):
+    raise SystemExit(0)
+
+def _run_local_worker(path):
+    # Terminating the worker unwinds it, so its parse pool is shut down with it
+    signal.signal(signal.SIGTERM, _stop)
+    run_worker(path)
+
+def _stop_workers(workers):
+    for worker in workers:
+        if worker.is_alive():
+            worker.terminate()
+    for worker in workers:
+        worker.join(timeout=10)
+
+def start_local_workers(count=JOB_WORKERS, path=JOB_QUEUE_DB_PATH):
+    """Start worker processes, they keep running independently of the caller's threads and reruns.
+
+    The workers aren't daemonic, so each can start its own parse pool. They
+    are terminated when the calling process exits.
+    """
+    # Spawned workers don't inherit the parent's threads, sockets or browser sessions
+    context = multiprocessing.get_context('spawn')
+    workers = []
+    for _ in range(count):
+        worker = context.Process(target=_run_local_worker, args=(path,))
+        worker.start()
+        workers.append(worker)
+    # Runs before multiprocessing's own exit handler, which would wait for them forever
+    atexit.register(_stop_workers, workers)
+    return workers
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run pipeline jobs queued by the Streamlit app or submit_job()")
+    parser.add_argument('--workers', type=int, default=JOB_WORKERS, help="Worker processes to run")
+    args = parser.parse_args(argv)
+
+    workers = start_local_workers(args.workers)
+    print(f"Started {len(workers)} workers, waiting for jobs in {JOB_QUEUE_DB_PATH}")
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+# keyword_matcher.py
+
+import re
+from functools import lru_cache
+import numpy as np
+from config import KEYWORD_WHOLE_WORD
+
+_WORD_CHAR = re.compile(r'\w')
+
+
+class KeywordMatcher:
+    """All keywords compiled into one case-insensitive regex.
+
+    A single pass over a text reports every keyword it contains, including
+    keywords that overlap or start at the same position. With whole_word the
+    keywords only match between word boundaries, so "AI" no longer matches "said".
+    """
+
+    def __init__(self, keywords, whole_word=KEYWORD_WHOLE_WORD):
+        self.whole_word = whole_word
+        # Case-insensitive duplicates collapse onto the first spelling
+        self.keywords = {}
+        for keyword in keywords:
+            if keyword and keyword.lower() not in self.keywords:
+                self.keywords[keyword.lower()] = keyword
+
+        lowered = sorted(self.keywords, key=len, reverse=True)
+        # The regex reports the longest keyword at each position, shorter ones
+        # starting at the same position are prefixes of it and checked directly
+        self._prefixes = {key: [other for other in lowered if other != key and key.startswith(other)] for key in lowered}
+
+        # One capture group per keyword, lastindex tells which one matched
+        self._group_keys = [None] + lowered
+        if lowered:
+            alternation = '|'.join(f'({re.escape(key)})' for key in lowered)
+            if whole_word:
+                pattern = rf'(?<!\w)(?=(?:{alternation})(?!\w))'
+            else:
+                pattern = rf'(?=(?:{alternation}))'
+            self._pattern = re.compile(pattern, re.IGNORECASE)
+        else:
+            self._pattern = None
+
+    def __bool__(self):
+        return self._pattern is not None
+
+    def iter_matches(self, text):
+        """Yield (position, keyword) for every keyword occurrence in text"""
+        if self._pattern is None or not text:
+            return
+        for match in self._pattern.finditer(text):
+            key = self._group_keys[match.lastindex]
+            position = match.start()
+            yield position, self.keywords[key]
+            for prefix in self._prefixes[key]:
+                end = position + len(prefix)
+                if not self.whole_word or not _WORD_CHAR.match(text, end):
+                    yield position, self.keywords[prefix]
+
+    def find_all(self, text):
+        """Set of keywords found in text"""
+        found = set()
+        for _, keyword in self.iter_matches(text):
+            found.add(keyword)
+            if len(found) == len(self.keywords):
+                break
+        return found
+
+    def search(self, text):
+        """True when text contains any of the keywords"""
+        return bool(self._pattern is not None and text and self._pattern.search(text))
+
+    def hit_matrix(self, texts):
+        """Boolean array with a row per text and a column per keyword, in the order of self.keywords.
+
+        The texts are joined into one string so the regex makes a single pass,
+        hits are mapped back to rows through their start offsets.
+        """
+        texts = [text or '' for text in texts]
+        matrix = np.zeros((len(texts), len(self.keywords)), dtype=bool)
+        if self._pattern is None or not texts:
+            return matrix
+
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts)) + 1
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        keyword_ids = {keyword: index for index, keyword in enumerate(self.keywords.values())}
+        positions = []
+        ids = []
+        for position, keyword in self.iter_matches('\x00'.join(texts)):
+            positions.append(position)
+            ids.append(keyword_ids[keyword])
+        if positions:
+            rows = np.searchsorted(starts, np.asarray(positions, dtype=np.int64), side='right') - 1
+            matrix[rows, ids] = True
+        return matrix
+
+    def hit_counts(self, texts):
+        """Number of distinct keywords found in each text, as a NumPy array"""
+        # A keyword counts once per text however often it appears
+        return self.hit_matrix(texts).sum(axis=1, dtype=np.int64)
+
+@lru_cache(maxsize=128)
+def _cached_matcher(keywords, whole_word):
+    return KeywordMatcher(keywords, whole_word)
+
+def get_keyword_matcher(keywords, whole_word=KEYWORD_WHOLE_WORD):
+    """Matcher for a keyword list, compiled once per distinct list"""
+    return _cached_matcher(tuple(keywords or ()), whole_word)
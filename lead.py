@@ -0,0 +1,112 @@
+# lead.py
+
+import pandas as pd
+
+FIELDS = ('name', 'website', 'industry', 'employee_count', 'description', 'job_titles', 'relevance_score')
+
+_MISSING = object()
+
+def format_job_titles(titles):
+    """job_titles as the "Name: Title; Name: Title" text written to exports"""
+    if isinstance(titles, dict):
+        return "; ".join(f"{name}: {title}" for name, title in titles.items())
+    return titles
+
+
+class Lead:
+    """A company record with fixed slots instead of a per-lead dict.
+
+    It keeps the dict interface the pipeline was written against (get, [],
+    in, keys, items, copy), so stages can treat it like the plain dicts they
+    used to pass around. Unknown keys go into a small overflow dict that is
+    only created when needed.
+    """
+    __slots__ = FIELDS + ('_extra',)
+
+    def __init__(self, **fields):
+        self._extra = None
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        return cls(**data)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def keys(self):
+        for field in FIELDS:
+            if getattr(self, field, _MISSING) is not _MISSING:
+                yield field
+        if self._extra:
+            yield from self._extra
+
+    def items(self):
+        for key in self.keys():
+            yield key, self[key]
+
+    def get(self, key, default=None):
+        if key in FIELDS:
+            return getattr(self, key, default)
+        return self._extra.get(key, default) if self._extra else default
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in FIELDS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self):
+        return self.keys()
+
+    def __len__(self):
+        return sum(1 for _ in self.keys())
+
+    def copy(self):
+        return Lead(**self.to_dict())
+
+    def __repr__(self):
+        return f"Lead({self.to_dict()!r})"
+
+
+class LeadBatch(list):
+    """A list of Lead records that converts to columns without per-lead dict copies"""
+
+    def __init__(self, leads=()):
+        super().__init__(Lead.from_dict(lead) for lead in leads)
+
+    def column(self, field, default=None):
+        return [lead.get(field, default) for lead in self]
+
+    def to_frame(self, flatten_job_titles=True):
+        """DataFrame with one column per field present in any lead"""
+        columns = {}
+        for field in FIELDS:
+            values = self.column(field, _MISSING)
+            if any(value is not _MISSING for value in values):
+                columns[field] = [None if value is _MISSING else value for value in values]
+
+        extra_keys = dict.fromkeys(key for lead in self if lead._extra for key in lead._extra)
+        for key in extra_keys:
+            columns[key] = self.column(key)
+
+        if flatten_job_titles and 'job_titles' in columns:
+            columns['job_titles'] = [format_job_titles(titles) for titles in columns['job_titles']]
+        return pd.DataFrame(columns)
+
+    def to_dicts(self):
+        return [lead.to_dict() for lead in self]
@@ -0,0 +1,206 @@
+# lead_store.py
+
+import json
+import threading
+import time
+from cache import connect
+from dedup import domain_key
+from filters import parse_employee_range
+from lead import Lead, LeadBatch
+from config import LEAD_STORE_DB_PATH, LEAD_STORE_MAX_AGE_SEC, EXPORT_CHUNK_SIZE
+
+_COLUMNS = ('name', 'website', 'industry', 'employee_count', 'description', 'job_titles', 'relevance_score')
+_ORDERS = {
+    'relevance_score': "relevance_score DESC, domain",
+    'name': "name COLLATE NOCASE, domain",
+    'updated_at': "updated_at DESC, domain"
+}
+
+
+def _row_values(company):
+    values = {column: company.get(column) or None for column in _COLUMNS}
+    # 0 is a real score, only a missing one leaves the stored score alone
+    values['relevance_score'] = company.get('relevance_score')
+    if values['job_titles'] is not None:
+        values['job_titles'] = json.dumps(values['job_titles'])
+    employee_range = parse_employee_range(values['employee_count'])
+    values['emp_low'], values['emp_high'] = employee_range or (None, None)
+    return values
+
+def _to_lead(row):
+    lead = Lead()
+    for column, value in zip(_COLUMNS, row):
+        if value is not None:
+            lead[column] = json.loads(value) if column == 'job_titles' else value
+    return lead
+
+def _where(industry=None, min_employees=None, max_employees=None, min_score=None):
+    """WHERE clause and parameters for the indexed filters"""
+    clauses = []
+    params = []
+    if industry:
+        clauses.append("industry = ? COLLATE NOCASE")
+        params.append(industry)
+    if min_employees is not None or max_employees is not None:
+        # Ranges that overlap the requested one, open-ended ranges have no upper bound
+        clauses.append("emp_low IS NOT NULL")
+        if max_employees is not None:
+            clauses.append("emp_low <= ?")
+            params.append(max_employees)
+        if min_employees is not None:
+            clauses.append("(emp_high IS NULL OR emp_high >= ?)")
+            params.append(min_employees)
+    if min_score is not None:
+        clauses.append("relevance_score >= ?")
+        params.append(min_score)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+class LeadStore:
+    """Leads from every run in one SQLite table, one row per domain.
+
+    Upserts only overwrite the fields a lead actually has, so a later run
+    that collects a company without enriching it keeps the stored job
+    titles. Industry, employee range and relevance score are indexed for
+    paging through large histories.
+    """
+
+    def __init__(self, path=LEAD_STORE_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS leads (
+                    domain TEXT PRIMARY KEY,
+                    name TEXT,
+                    website TEXT,
+                    industry TEXT COLLATE NOCASE,
+                    employee_count TEXT,
+                    emp_low INTEGER,
+                    emp_high INTEGER,
+                    description TEXT,
+                    job_titles TEXT,
+                    relevance_score INTEGER,
+                    enriched_at REAL,
+                    run_id TEXT,
+                    first_seen_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_leads_industry ON leads (industry)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_leads_employees ON leads (emp_low, emp_high)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_leads_score ON leads (relevance_score DESC, domain)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_leads_updated ON leads (updated_at)")
+
+    def upsert(self, company, run_id=None, enriched=False):
+        return self.upsert_many([company], run_id, enriched)
+
+    def upsert_many(self, companies, run_id=None, enriched=False):
+        """Insert or update companies by domain, returns how many had a website to key on"""
+        now = time.time()
+        rows = []
+        for company in companies:
+            domain = domain_key(company.get('website'))
+            if not domain:
+                continue
+            values = _row_values(company)
+            rows.append((
+                domain, values['name'], values['website'], values['industry'], values['employee_count'],
+                values['emp_low'], values['emp_high'], values['description'], values['job_titles'],
+                values['relevance_score'], now if enriched else None, run_id, now, now
+            ))
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                INSERT INTO leads (domain, name, website, industry, employee_count, emp_low, emp_high, description,
+                                   job_titles, relevance_score, enriched_at, run_id, first_seen_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (domain) DO UPDATE SET
+                    name = COALESCE(excluded.name, name),
+                    website = COALESCE(excluded.website, website),
+                    industry = COALESCE(excluded.industry, industry),
+                    employee_count = COALESCE(excluded.employee_count, employee_count),
+                    emp_low = CASE WHEN excluded.employee_count IS NULL THEN emp_low ELSE excluded.emp_low END,
+                    emp_high = CASE WHEN excluded.employee_count IS NULL THEN emp_high ELSE excluded.emp_high END,
+                    description = COALESCE(excluded.description, description),
+                    job_titles = COALESCE(excluded.job_titles, job_titles),
+                    relevance_score = COALESCE(excluded.relevance_score, relevance_score),
+                    enriched_at = COALESCE(excluded.enriched_at, enriched_at),
+                    run_id = COALESCE(excluded.run_id, run_id),
+                    updated_at = excluded.updated_at
+            """, rows)
+        return len(rows)
+
+    def get(self, website):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM leads WHERE domain = ?", (domain_key(website),)
+            ).fetchone()
+        return _to_lead(row) if row else None
+
+    def get_enriched(self, website, max_age=LEAD_STORE_MAX_AGE_SEC):
+        """Stored lead for a website if it was enriched within max_age seconds"""
+        domain = domain_key(website)
+        if not domain:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM leads WHERE domain = ? AND enriched_at >= ?",
+                (domain, time.time() - max_age)
+            ).fetchone()
+        return _to_lead(row) if row else None
+
+    def count(self, **filters):
+        where, params = _where(**filters)
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM leads" + where, params).fetchone()[0]
+
+    def query(self, limit=50, offset=0, order_by='relevance_score', **filters):
+        """One page of stored leads matching the filters.
+
+        filters are industry, min_employees, max_employees and min_score, all
+        answered from indexes.
+        """
+        where, params = _where(**filters)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM leads{where} ORDER BY {_ORDERS[order_by]} LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return LeadBatch(_to_lead(row) for row in rows)
+
+    def iter_leads(self, chunk_size=EXPORT_CHUNK_SIZE, order_by='relevance_score', **filters):
+        """Every matching lead, read chunk by chunk on a connection of its own"""
+        where, params = _where(**filters)
+        conn = connect(self.path)
+        try:
+            cursor = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM leads{where} ORDER BY {_ORDERS[order_by]}", params
+            )
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield _to_lead(row)
+        finally:
+            conn.close()
+
+    def industries(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT industry FROM leads WHERE industry IS NOT NULL ORDER BY industry"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+_lead_store = None
+_store_lock = threading.Lock()
+
+def get_lead_store():
+    global _lead_store
+    if _lead_store is None:
+        with _store_lock:
+            if _lead_store is None:
+                _lead_store = LeadStore()
+    return _lead_store
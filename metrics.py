@@ -0,0 +1,252 @@
+# metrics.py
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from config import METRICS_LATENCY_BUCKETS_SEC
+
+# Prometheus metric names get this prefix
+_NAMESPACE = 'leadgen'
+
+
+class Histogram:
+    """Observation counts per bucket upper bound, with their sum, min and max"""
+    __slots__ = ('bounds', 'counts', 'count', 'sum', 'min', 'max')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # One count per bound plus the +Inf bucket
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """Estimated by interpolating inside the bucket it falls in, like Prometheus' histogram_quantile"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                lower = self.bounds[index - 1] if index else 0.0
+                # The +Inf bucket has no upper bound, the largest value seen stands in for it
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                estimate = lower + (upper - lower) * (rank - cumulative) / count
+                return min(max(estimate, self.min), self.max)
+            cumulative += count
+        return self.max
+
+
+class Stopwatch:
+    """Adds up the time spent in its with-blocks, for stages that run a little at a time"""
+
+    def __init__(self):
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed += time.perf_counter() - self._start
+
+
+class MetricsRegistry:
+    """Counters and latency histograms of one process, keyed by name and labels.
+
+    Timings are histograms of seconds. Everything is kept in memory behind a
+    lock, snapshot() turns it into plain dicts that can be stored, sent
+    between processes and rendered with to_json() or to_prometheus().
+    """
+
+    def __init__(self, buckets=METRICS_LATENCY_BUCKETS_SEC):
+        self.buckets = tuple(sorted(buckets))
+        self.started_at = time.time()
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe how long the block took, also when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter_value(self, name, **labels):
+        """Sum of the counter over every series that has the given labels"""
+        wanted = set(labels.items())
+        with self._lock:
+            return sum(value for (counter, series), value in self._counters.items()
+                       if counter == name and wanted <= set(series))
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            histograms = []
+            for (name, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                cumulative = 0
+                buckets = []
+                for bound, count in zip(self.buckets + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    buckets.append([bound, cumulative])
+                histograms.append({
+                    'name': name, 'labels': dict(labels), 'count': histogram.count, 'sum': histogram.sum,
+                    'min': histogram.min, 'max': histogram.max,
+                    'p50': histogram.quantile(0.5), 'p95': histogram.quantile(0.95), 'buckets': buckets
+                })
+        return {'started_at': self.started_at, 'taken_at': time.time(),
+                'counters': counters, 'histograms': histograms}
+
+
+_registry = MetricsRegistry()
+
+def get_metrics():
+    return _registry
+
+def increment(name, value=1, **labels):
+    _registry.increment(name, value, **labels)
+
+def observe(name, value, **labels):
+    _registry.observe(name, value, **labels)
+
+def timer(name, **labels):
+    return _registry.timer(name, **labels)
+
+def counter_value(name, **labels):
+    return _registry.counter_value(name, **labels)
+
+def reset_metrics():
+    _registry.reset()
+
+def snapshot():
+    return _registry.snapshot()
+
+def timed(name, **labels):
+    """Decorator observing each call's duration in the name histogram"""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _registry.timer(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def timed_iter(iterable, name, **labels):
+    """Yield from iterable, observing the total time spent waiting on it once it ends"""
+    stopwatch = Stopwatch()
+    iterator = iter(iterable)
+    try:
+        while True:
+            with stopwatch:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+            yield item
+    finally:
+        # Stopping early closes the wrapped generator too, so its own cleanup runs
+        if hasattr(iterator, 'close'):
+            iterator.close()
+        _registry.observe(name, stopwatch.elapsed, **labels)
+
+
+def to_json(metrics=None):
+    """A snapshot as JSON, the current process' metrics when none is given"""
+    return json.dumps(metrics or snapshot(), indent=2)
+
+def _label_text(labels, extra=None):
+    items = list(labels.items()) + list((extra or {}).items())
+    if not items:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in items)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(items, escaped)) + '}'
+
+def _number(value):
+    if isinstance(value, str):
+        return value
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def to_prometheus(metrics=None):
+    """A snapshot in the Prometheus text exposition format"""
+    metrics = metrics or snapshot()
+    lines = []
+    declared = set()
+    for counter in metrics['counters']:
+        name = f"{_NAMESPACE}_{counter['name']}"
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_label_text(counter['labels'])} {_number(counter['value'])}")
+    for histogram in metrics['histograms']:
+        name = f"{_NAMESPACE}_{histogram['name']}"
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        for bound, cumulative in histogram['buckets']:
+            lines.append(f"{name}_bucket{_label_text(histogram['labels'], {'le': _number(bound)})} {cumulative}")
+        lines.append(f"{name}_sum{_label_text(histogram['labels'])} {_number(histogram['sum'])}")
+        lines.append(f"{name}_count{_label_text(histogram['labels'])} {histogram['count']}")
+    return '\n'.join(lines) + '\n'
+
+def write_metrics(path, metrics=None):
+    """Write a snapshot to path, as Prometheus text for .prom/.txt files and JSON otherwise"""
+    text = to_prometheus(metrics) if path.endswith(('.prom', '.txt')) else to_json(metrics)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return path
+
+def report_rows(metrics):
+    """One row per timing series of a snapshot, slowest in total first, for a run report"""
+    rows = []
+    for histogram in metrics['histograms']:
+        labels = ', '.join(f"{key}={value}" for key, value in histogram['labels'].items())
+        rows.append({
+            'timing': histogram['name'] + (f" ({labels})" if labels else ''),
+            'count': histogram['count'],
+            'total_sec': round(histogram['sum'], 3),
+            'mean_sec': round(histogram['sum'] / histogram['count'], 4) if histogram['count'] else None,
+            'p50_sec': None if histogram['p50'] is None else round(histogram['p50'], 4),
+            'p95_sec': None if histogram['p95'] is None else round(histogram['p95'], 4),
+            'max_sec': None if histogram['max'] is None else round(histogram['max'], 4)
+        })
+    return sorted(rows, key=lambda row: row['total_sec'], reverse=True)
+
+def counter_totals(metrics, name):
+    """{label values: value} of one counter in a snapshot, e.g. pages per tier"""
+    return {', '.join(str(value) for value in counter['labels'].values()) or name: counter['value']
+            for counter in metrics['counters'] if counter['name'] == name}
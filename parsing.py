@@ -0,0 +1,202 @@
+# parsing.py
+
+import atexit
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from bs4 import BeautifulSoup
+from config import PARSER_PROCESSES
+from metrics import timer
+
+# lxml with precompiled XPath is the fast path, BeautifulSoup's html.parser the fallback
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = etree = None
+
+# Class matchers, compiled once instead of a lambda per find() call. A class
+# attribute matches when any of its classes contains the term.
+_LEADERSHIP_CLASS = re.compile('leadership', re.IGNORECASE)
+_TEAM_CLASS = re.compile('team', re.IGNORECASE)
+_LEADER_CLASS = re.compile('leader|member|profile|person', re.IGNORECASE)
+_TITLE_CLASS = re.compile('title|position|role', re.IGNORECASE)
+
+_CARD_FIELDS = (
+    ('name', 'h3', 'company-name'),
+    ('industry', 'span', 'industry'),
+    ('employee_count', 'span', 'employee-count'),
+    ('description', 'p', 'description')
+)
+
+
+def _has_class(class_name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+if etree is not None:
+    _REGEX_NS = {'re': 'http://exslt.org/regular-expressions'}
+
+    def _xpath(expression):
+        return etree.XPath(expression, namespaces=_REGEX_NS)
+
+    # Section lookups in the order the original parser tried them
+    _LEADERSHIP_SECTIONS = [
+        _xpath(f"(//section[re:test(@class, '{_LEADERSHIP_CLASS.pattern}', 'i')])[1]"),
+        _xpath(f"(//div[re:test(@class, '{_TEAM_CLASS.pattern}', 'i')])[1]"),
+        _xpath(f"(//div[re:test(@class, '{_LEADERSHIP_CLASS.pattern}', 'i')])[1]"),
+        _xpath(f"(//section[re:test(@class, '{_TEAM_CLASS.pattern}', 'i')])[1]")
+    ]
+    _LEADERS = _xpath(f".//*[self::div or self::article][re:test(@class, '{_LEADER_CLASS.pattern}', 'i')]")
+    _LEADER_NAME = _xpath("(.//*[self::h3 or self::h4 or self::h5 or self::strong or self::b])[1]")
+    _LEADER_TITLE = _xpath(f"(.//*[self::p or self::span][re:test(@class, '{_TITLE_CLASS.pattern}', 'i')])[1]")
+    _COMPANY_CARDS = _xpath(f"//div[{_has_class('company-card')}]")
+    _CARD_XPATHS = {field: _xpath(f"(.//{tag}[{_has_class(class_name)}])[1]") for field, tag, class_name in _CARD_FIELDS}
+    _CARD_WEBSITE = _xpath(f"(.//a[{_has_class('company-website')}])[1]/@href")
+    _HTML_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+def _document(html):
+    if not html or not html.strip():
+        return None
+    # Parsed as bytes so pages with an XML encoding declaration are accepted
+    return lxml.html.document_fromstring(html.encode('utf-8', 'replace'), parser=_HTML_PARSER)
+
+def _first(xpath, node):
+    found = xpath(node)
+    return found[0] if found else None
+
+
+def parse_job_titles(html):
+    """{name: title} of the people listed in the page's leadership or team section"""
+    if etree is None:
+        return _parse_job_titles_bs4(html)
+
+    job_titles = {}
+    document = _document(html)
+    if document is None:
+        return job_titles
+
+    for find_section in _LEADERSHIP_SECTIONS:
+        section = _first(find_section, document)
+        if section is None:
+            continue
+        leader_elements = _LEADERS(section)
+        if leader_elements:
+            for leader in leader_elements:
+                name_elem = _first(_LEADER_NAME, leader)
+                title_elem = _first(_LEADER_TITLE, leader)
+                if name_elem is not None and title_elem is not None:
+                    job_titles[name_elem.text_content().strip()] = title_elem.text_content().strip()
+
+            if job_titles:
+                break
+
+    return job_titles
+
+def parse_company_cards(html):
+    """Companies on a directory page as plain dicts, cards missing a field are skipped"""
+    if etree is None:
+        return _parse_company_cards_bs4(html)
+
+    companies = []
+    document = _document(html)
+    if document is None:
+        return companies
+
+    for card in _COMPANY_CARDS(document):
+        company = {}
+        for field, _, _ in _CARD_FIELDS:
+            element = _first(_CARD_XPATHS[field], card)
+            if element is None:
+                break
+            company[field] = element.text_content().strip()
+        website = _first(_CARD_WEBSITE, card)
+        if len(company) < len(_CARD_FIELDS) or website is None:
+            print(f"Error parsing company card: missing fields in {company.get('name', 'unnamed card')}")
+            continue
+        company['website'] = str(website)
+        companies.append(company)
+    return companies
+
+def _parse_job_titles_bs4(html):
+    job_titles = {}
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Look for common leadership patterns
+    leadership_sections = [
+        soup.find('section', class_=_LEADERSHIP_CLASS),
+        soup.find('div', class_=_TEAM_CLASS),
+        soup.find('div', class_=_LEADERSHIP_CLASS),
+        soup.find('section', class_=_TEAM_CLASS)
+    ]
+
+    for section in leadership_sections:
+        if section:
+            leader_elements = section.find_all(['div', 'article'], class_=_LEADER_CLASS)
+
+            if leader_elements:
+                for leader in leader_elements:
+                    name_elem = leader.find(['h3', 'h4', 'h5', 'strong', 'b'])
+                    title_elem = leader.find(['p', 'span'], class_=_TITLE_CLASS)
+
+                    if name_elem and title_elem:
+                        job_titles[name_elem.text.strip()] = title_elem.text.strip()
+
+                if job_titles:
+                    break
+
+    return job_titles
+
+def _parse_company_cards_bs4(html):
+    companies = []
+    soup = BeautifulSoup(html, 'html.parser')
+    for card in soup.find_all('div', class_='company-card'):
+        try:
+            company = {field: card.find(tag, class_=class_name).text.strip() for field, tag, class_name in _CARD_FIELDS}
+            company['website'] = card.find('a', class_='company-website')['href']
+            companies.append(company)
+        except Exception as e:
+            print(f"Error parsing company card: {str(e)}")
+    return companies
+
+
+_parse_pool = None
+_pool_lock = threading.Lock()
+
+def get_parse_pool():
+    """Process pool shared by all parsing callers.
+
+    None when PARSER_PROCESSES is 0, or inside a daemonic process, which is
+    not allowed to start processes of its own.
+    """
+    global _parse_pool
+    if PARSER_PROCESSES == 0 or multiprocessing.current_process().daemon:
+        return None
+    if _parse_pool is None:
+        with _pool_lock:
+            if _parse_pool is None:
+                # Spawned workers only import this module, nothing of the parent's threads
+                _parse_pool = ProcessPoolExecutor(max_workers=PARSER_PROCESSES,
+                                                  mp_context=multiprocessing.get_context('spawn'))
+                atexit.register(shutdown_parse_pool)
+    return _parse_pool
+
+def shutdown_parse_pool():
+    global _parse_pool
+    with _pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(cancel_futures=True)
+            _parse_pool = None
+
+def run_parser(parse, html):
+    """parse(html) in the parse pool, so parsing runs outside the GIL of the fetching threads.
+
+    parse must be a module-level function so it can be sent to the workers.
+    The calling thread waits for the result, other threads keep fetching.
+    The time recorded includes sending the page to the worker and back.
+    """
+    pool = get_parse_pool()
+    with timer('parse_seconds', parser=parse.__name__):
+        if pool is None:
+            return parse(html)
+        return pool.submit(parse, html).result()
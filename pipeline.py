@@ -0,0 +1,263 @@
+# pipeline.py
+
+import time
+from functools import partial
+from itertools import islice
+from checkpoint import RunCheckpoint, new_run_id
+from data_processor import iter_enhanced_companies
+from dedup import domain_key, iter_deduplicated, merge_leads
+from filters import iter_pre_scraping_filters
+from lead import Lead, LeadBatch
+from lead_store import get_lead_store
+from metrics import observe, reset_metrics, snapshot, timed_iter, timer
+from ranker import rank_leads
+from scraper import iter_company_directories
+from serper_api import iter_search_companies
+from config import DEDUP_ENABLED, LEAD_STORE_SKIP_ENRICHED, MAX_PAGES_PER_SEARCH
+
+SERPER_SOURCE = "Serper API (Google Search)"
+SCRAPING_SOURCE = "Web Scraping"
+SOURCE_ALIASES = {'serper': SERPER_SOURCE, 'scraping': SCRAPING_SOURCE}
+# What a stored enrichment may fill in, its score was computed under another run's criteria
+_REUSED_FIELDS = ('job_titles', 'name', 'industry', 'employee_count', 'description')
+
+
+class RunTakenOver(Exception):
+    """Thrown into iter_pipeline when another process is running the run now.
+
+    The run stops without touching its checkpoint status or metrics, they
+    belong to the new owner.
+    """
+
+
+def collect_companies(settings, api_key=None):
+    return list(iter_collect_companies(settings, api_key))
+
+def iter_collect_companies(settings, api_key=None):
+    industries = settings['industries']
+    per_industry = settings['max_companies'] // len(industries)
+
+    if SOURCE_ALIASES.get(settings['data_source'], settings['data_source']) == SERPER_SOURCE:
+        yield from iter_search_companies(
+            industries,
+            api_key,
+            per_industry,
+            use_cache=settings.get('use_search_cache', True),
+            refresh=settings.get('refresh_search_cache', False)
+        )
+        return
+
+    # Directory URL templates like "https://example-directory.com/companies/{industry}",
+    # every directory of an industry is paginated concurrently
+    directory_urls = settings.get('directory_urls')
+    if directory_urls:
+        for industry in industries:
+            urls = [template.format(industry=industry) for template in directory_urls]
+            companies = iter_company_directories(urls, settings.get('max_pages', MAX_PAGES_PER_SEARCH))
+            for company in islice(companies, per_industry):
+                if not company.get('industry'):
+                    company['industry'] = industry
+                yield company
+        return
+
+    # Without directories the scraping source is simulated for demonstration
+    for industry in industries:
+        for j in range(per_industry):
+            yield Lead(
+                name=f"{industry.capitalize()} Company {j}",
+                website=f"https://www.{industry}company{j}.com",
+                industry=industry,
+                employee_count=f"{(j+1)*50}-{(j+1)*100}",
+                description=f"A leading {industry} company specializing in innovative solutions."
+            )
+
+def _event(stage, progress, message, company=None, companies=None, restored=False, position=None):
+    return {'stage': stage, 'progress': progress, 'message': message, 'company': company,
+            'companies': companies, 'restored': restored, 'position': position}
+
+def iter_pipeline(settings, api_key=None, run_id=None):
+    """Stream a collect -> dedup -> filter -> enhance -> rank run as progress events.
+
+    Each event is a dict with 'stage', 'progress' (0-100) and 'message'.
+    'enhance' events carry the company that just finished in 'company' and
+    its checkpoint position in 'position', the final 'done' event carries
+    the ranked list in 'companies'. Companies enriched before a resume come
+    back with 'restored' set. Collection,
+    filtering and enrichment are chained lazily, so companies are enriched
+    while the rest are still being collected.
+
+    Every stage is checkpointed under run_id. Passing the run_id of an
+    interrupted run resumes it with the settings it was started with. A run
+    interrupted before filtering finished collects again, the companies it
+    had already enriched are restored by domain instead of enriched again.
+
+    The process' metrics are reset when the run starts and their snapshot is
+    saved with the checkpoint when it ends or is interrupted, as the report
+    of this attempt at the run. stage_seconds{stage="enhance"} includes the
+    collection it waits on, since the stages are chained.
+    """
+    run_id = run_id or new_run_id()
+    reset_metrics()
+    started = time.perf_counter()
+    checkpoint = RunCheckpoint(run_id)
+    if checkpoint.exists():
+        settings = checkpoint.load_settings()
+        yield _event('start', 0, f"♻️ Resuming run {run_id}")
+    else:
+        checkpoint.start(settings)
+        yield _event('start', 0, f"🚀 Starting run {run_id}")
+
+    taken_over = False
+    try:
+        yield from _iter_stages(checkpoint, settings, api_key)
+    except RunTakenOver:
+        taken_over = True
+        raise
+    except BaseException:
+        checkpoint.set_status('interrupted')
+        raise
+    finally:
+        if not taken_over:
+            observe('run_seconds', time.perf_counter() - started)
+            checkpoint.save_metrics(snapshot())
+    checkpoint.set_status('complete')
+
+def _iter_stages(checkpoint, settings, api_key):
+    counts = {'collected': 0, 'duplicates': 0, 'passed': 0, 'reused': 0, 'restored': 0, 'finished': False}
+    store = get_lead_store()
+    lookup = None
+    if settings.get('skip_enriched', LEAD_STORE_SKIP_ENRICHED):
+        lookup = partial(_stored_enrichment, store)
+    carried = {}
+
+    if checkpoint.is_complete('filter'):
+        companies = _ordered(checkpoint.load_items('filter'))
+        done = {position: Lead.from_dict(item) for position, item in checkpoint.load_items('enhance').items()}
+        counts.update(collected=len(companies), passed=len(companies), finished=True)
+        yield _event('filter', 20, f"✅ {len(companies)} companies passed filters")
+        for position in sorted(done):
+            yield _event('enhance', 20, f"♻️ Restored {done[position].get('name', 'unknown company')}",
+                         company=done[position], restored=True, position=position)
+        pending = [position for position in range(len(companies)) if position not in done]
+        source = (companies[position] for position in pending)
+        enhanced = len(done)
+    else:
+        # Positions are only stable once filtering has finished, so an
+        # interrupted collection starts over (the page caches make that cheap).
+        # Enrichment runs alongside it, what was already enriched is kept
+        # aside and handed back when collection reaches the company again
+        carried = _carry_over_enrichments(checkpoint)
+        if carried:
+            lookup = partial(_restored_enrichment, carried, lookup)
+        checkpoint.reset_stages('collect', 'filter', 'enhance', 'export')
+        yield _event('collect', 0, "🔍 Collecting company data...")
+        pending = None
+        source = _checkpointed_source(checkpoint, settings, api_key, counts)
+        enhanced = 0
+
+    enhanced_companies = timed_iter(iter_enhanced_companies(source, lookup=lookup), 'stage_seconds', stage='enhance')
+    for index, company, reused in enhanced_companies:
+        position = pending[index] if pending is not None else index
+        checkpoint.save_item('enhance', position, company)
+        # Reused enrichments keep their original date so they still expire
+        store.upsert(company, checkpoint.run_id, enriched=not reused)
+        restored = reused and domain_key(company.get('website')) in carried
+        counts['restored' if restored else 'reused'] += reused
+        enhanced += 1
+        yield _event('enhance', _enhance_progress(counts, enhanced, settings['max_companies']),
+                     f"{'♻️ Restored' if restored else '🔍 Enhanced'} {enhanced}/{counts['passed']}: "
+                     f"{company.get('name', 'unknown company')}",
+                     company=company, position=position)
+
+    checkpoint.complete_stage('enhance')
+    checkpoint.reset_stages('restore')
+    companies = _ordered(checkpoint.load_items('enhance'))
+    restored_note = f", {counts['restored']} restored from the interrupted run" if counts['restored'] else ""
+    yield _event('enhance', 95, f"✅ Enhanced {len(companies)} companies "
+                                f"({counts['collected']} collected, {counts['duplicates']} duplicates merged, "
+                                f"{counts['reused']} reused from the lead store{restored_note})")
+
+    # Ranking needs every company, it is the only stage that waits for all of them
+    if settings.get('ranking_criteria'):
+        yield _event('rank', 95, "🔍 Ranking companies by relevance...")
+        with timer('stage_seconds', stage='rank'):
+            companies = rank_leads(companies, settings['ranking_criteria'], top_k=settings.get('top_k'))
+    checkpoint.complete_stage('rank', companies)
+    store.upsert_many(companies, checkpoint.run_id)
+    yield _event('done', 100, f"✅ Successfully generated {len(companies)} leads!", companies=companies)
+
+def _carry_over_enrichments(checkpoint):
+    """{domain: enriched company} of earlier attempts at the run, kept under 'restore' until it completes"""
+    carried = {}
+    # An attempt interrupted while restoring still has its older enrichments under 'restore'
+    for stage in ('restore', 'enhance'):
+        for item in checkpoint.load_items(stage).values():
+            domain = domain_key(item.get('website'))
+            if domain:
+                carried[domain] = item
+    checkpoint.replace_items('restore', carried.values())
+    return carried
+
+def _restored_enrichment(carried, lookup, company):
+    """The company as an earlier attempt at the run enriched it, else what lookup finds"""
+    item = carried.get(domain_key(company.get('website')))
+    if item is not None:
+        return Lead.from_dict(item)
+    return lookup(company) if lookup else None
+
+def _stored_enrichment(store, company):
+    """The company with its stored job titles when it was enriched recently, else None"""
+    stored = store.get_enriched(company.get('website'))
+    if stored is None or not stored.get('job_titles'):
+        return None
+    return merge_leads(company, {field: stored.get(field) for field in _REUSED_FIELDS})
+
+def _checkpointed_source(checkpoint, settings, api_key, counts):
+    def collected():
+        companies = timed_iter(iter_collect_companies(settings, api_key), 'stage_seconds', stage='collect')
+        for position, company in enumerate(companies):
+            checkpoint.save_item('collect', position, company)
+            counts['collected'] += 1
+            yield company
+
+    # Duplicates are dropped before filtering so no domain is enriched twice
+    companies = collected()
+    if settings.get('deduplicate', DEDUP_ENABLED):
+        companies = iter_deduplicated(companies, stats=counts)
+
+    for position, company in enumerate(iter_pre_scraping_filters(companies, settings.get('filters'))):
+        checkpoint.save_item('filter', position, company)
+        counts['passed'] += 1
+        yield company
+    counts['finished'] = True
+
+    # From here on a crash resumes with the enrichment that is still missing
+    checkpoint.complete_stage('collect')
+    checkpoint.complete_stage('filter')
+
+def _enhance_progress(counts, enhanced, max_companies):
+    # Collection is 20% of the bar and enrichment 75%, while collection is
+    # still running only the share collected so far can be counted
+    collect_share = 1 if counts['finished'] else min(1, counts['collected'] / max(max_companies, 1))
+    enhance_share = enhanced / max(counts['passed'], 1)
+    return int(20 * collect_share + 75 * collect_share * enhance_share)
+
+def run_pipeline(settings, api_key=None, run_id=None, progress=None):
+    """Run the pipeline to completion and return (run_id, ranked companies).
+
+    progress(value, message) is called for every event, without it the
+    messages are printed.
+    """
+    run_id = run_id or new_run_id()
+    companies = []
+    for event in iter_pipeline(settings, api_key, run_id):
+        if progress:
+            progress(event['progress'], event['message'])
+        else:
+            print(event['message'])
+        if event['stage'] == 'done':
+            companies = event['companies']
+    return run_id, companies
+
+def _ordered(items):
+    return LeadBatch(items[position] for position in sorted(items))
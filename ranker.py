@@ -1,44 +1,157 @@
 # ranker.py
 
-from filters import parse_employee_count
+import numpy as np
+import pandas as pd
+from filters import parse_employee_count, parse_employee_ranges
+from keyword_matcher import KeywordMatcher, get_keyword_matcher
+from metrics import timer
+from config import VECTORIZED_RANKING_MIN_LEADS, DEFAULT_RANKING_WEIGHTS
 
-def rank_leads(companies, target_criteria):
+def ranking_weights(target_criteria):
+    """Points per criterion, the defaults overridden by target_criteria['weights']"""
+    return {**DEFAULT_RANKING_WEIGHTS, **(target_criteria.get('weights') or {})}
+
+def rank_leads(companies, target_criteria, top_k=None):
+    """Score companies against the criteria and return them best first.
+
+    Large lead sets go through the vectorized scorer, top_k keeps only the
+    best k leads without sorting the rest.
+    """
     if not target_criteria:
         return companies
-        
+
+    if len(companies) >= VECTORIZED_RANKING_MIN_LEADS:
+        return rank_leads_vectorized(companies, target_criteria, top_k)
+
+    with timer('ranking_seconds', method='loop'):
+        return _rank_loop(companies, target_criteria, top_k)
+
+def _rank_loop(companies, target_criteria, top_k):
+    weights = ranking_weights(target_criteria)
+    target_industry = (target_criteria.get('industry') or '').lower()
+    min_emp = target_criteria.get('min_employees', 0)
+    max_emp = target_criteria.get('max_employees', float('inf'))
+    matcher = get_keyword_matcher(target_criteria.get('keywords'))
+
     for company in companies:
         score = 0
-        
+
         # Industry match (highest weight)
-        if target_criteria.get('industry') and company.get('industry'):
-            if company.get('industry').lower() == target_criteria.get('industry').lower():
-                score += 30
-        
-        # Employee count range
+        if target_industry and company.get('industry'):
+            if company.get('industry').lower() == target_industry:
+                score += weights['industry']
+
+        # Employee count range, parse_employee_count is memoized and never raises
         if company.get('employee_count'):
-            try:
-                emp_count = parse_employee_count(company.get('employee_count', '0'))
-                min_emp = target_criteria.get('min_employees', 0)
-                max_emp = target_criteria.get('max_employees', float('inf'))
-                
-                if min_emp <= emp_count <= max_emp:
-                    score += 20
-            except:
-                pass
-        
+            if min_emp <= parse_employee_count(company.get('employee_count')) <= max_emp:
+                score += weights['employees']
+
         # Keyword matching in description (medium weight)
-        if target_criteria.get('keywords') and company.get('description'):
-            description = company.get('description', '').lower()
-            for keyword in target_criteria.get('keywords', []):
-                if keyword.lower() in description:
-                    score += 5
-        
+        if matcher and company.get('description'):
+            score += weights['keyword'] * len(matcher.find_all(company.get('description', '')))
+
         # Executive presence (low weight)
         if company.get('job_titles') and len(company.get('job_titles', {})) > 0:
-            score += min(10, len(company.get('job_titles', {})) * 2)
-        
+            score += min(weights['max_executive'], len(company.get('job_titles', {})) * weights['executive'])
+
         company['relevance_score'] = score
-    
+
     # Sort by relevance score
     ranked_companies = sorted(companies, key=lambda x: x.get('relevance_score', 0), reverse=True)
-    return ranked_companies
+    return ranked_companies[:top_k] if top_k is not None else ranked_companies
+
+def rank_leads_vectorized(companies, target_criteria, top_k=None):
+    """Same scoring as rank_leads computed column-wise with NumPy"""
+    return RankingFeatures(companies).rank(target_criteria, top_k)
+
+
+class RankingFeatures:
+    """Per-lead ranking inputs extracted once, so new criteria only re-score.
+
+    Industries, employee counts and executive counts are parsed when the
+    features are built. Keyword hits are computed per keyword the first time
+    a criteria set asks for it and kept, so changing weights, the target
+    industry or the size range never rescans the descriptions, and adding a
+    keyword only scans for that keyword.
+    """
+
+    def __init__(self, companies):
+        with timer('ranking_features_seconds'):
+            self.companies = list(companies)
+            industries = pd.Series([(company.get('industry') or '').lower() for company in self.companies], dtype=object)
+            self._industry_codes, self._industries = pd.factorize(industries)
+
+            employee_counts = pd.Series([company.get('employee_count') or '' for company in self.companies], dtype=object)
+            # Unparseable counts are treated as 0 like the loop
+            self._has_employees = employee_counts.to_numpy() != ''
+            lower_bounds, _ = parse_employee_ranges(employee_counts)
+            self._employees = np.nan_to_num(lower_bounds, nan=0)
+
+            self._executives = np.fromiter((len(company.get('job_titles') or {}) for company in self.companies),
+                                           dtype=np.int64, count=len(self.companies))
+            self._descriptions = [company.get('description') or '' for company in self.companies]
+            self._keyword_hits = {}
+
+    def __len__(self):
+        return len(self.companies)
+
+    def keyword_hits(self, keywords):
+        """Number of the keywords found in each description"""
+        lowered = list(dict.fromkeys(keyword.lower() for keyword in keywords or () if keyword))
+        missing = [keyword for keyword in lowered if keyword not in self._keyword_hits]
+        if missing:
+            matrix = KeywordMatcher(missing).hit_matrix(self._descriptions)
+            for column, keyword in enumerate(missing):
+                self._keyword_hits[keyword] = matrix[:, column]
+
+        hits = np.zeros(len(self.companies), dtype=np.int64)
+        for keyword in lowered:
+            hits += self._keyword_hits[keyword]
+        return hits
+
+    def score(self, target_criteria):
+        weights = ranking_weights(target_criteria)
+        scores = np.zeros(len(self.companies), dtype=np.asarray(list(weights.values())).dtype)
+
+        # Industry match (highest weight)
+        target_industry = (target_criteria.get('industry') or '').lower()
+        if target_industry:
+            scores += weights['industry'] * (np.asarray(self._industries) == target_industry)[self._industry_codes]
+
+        # Employee count range
+        min_emp = target_criteria.get('min_employees', 0)
+        max_emp = target_criteria.get('max_employees', float('inf'))
+        scores += weights['employees'] * (self._has_employees & (self._employees >= min_emp) & (self._employees <= max_emp))
+
+        # Keyword matching in description (medium weight)
+        scores += weights['keyword'] * self.keyword_hits(target_criteria.get('keywords'))
+
+        # Executive presence (low weight)
+        scores += np.minimum(weights['max_executive'], self._executives * weights['executive'])
+        return scores
+
+    def rank(self, target_criteria, top_k=None):
+        """Companies best first with relevance_score set, like rank_leads"""
+        if not target_criteria:
+            return list(self.companies)
+        with timer('ranking_seconds', method='vectorized'):
+            scores = self.score(target_criteria)
+            for company, score in zip(self.companies, scores.tolist()):
+                company['relevance_score'] = score
+            return [self.companies[i] for i in top_indices(scores, top_k)]
+
+
+def top_indices(scores, top_k=None):
+    """Indices of the best scores, ties keep input order like a stable sort"""
+    if top_k is None or top_k >= len(scores):
+        return np.argsort(-scores, kind='stable')
+    if top_k <= 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # Partial selection: everything above the k-th best score, then the
+    # earliest leads tied with it until k are taken
+    threshold = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+    above = np.flatnonzero(scores > threshold)
+    tied = np.flatnonzero(scores == threshold)[:top_k - len(above)]
+    selected = np.concatenate([above, tied])
+    return selected[np.argsort(-scores[selected], kind='stable')]
@@ -0,0 +1,120 @@
+# rate_limiter.py
+
+import threading
+import time
+from urllib.parse import urlparse
+from cache import connect
+from config import DOMAIN_RATE_PER_SEC, DOMAIN_BURST, DOMAIN_RATE_OVERRIDES, RATE_LIMIT_DB_PATH
+from metrics import observe
+
+def domain_of(url):
+    host = (urlparse(url).hostname or url).lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return how long the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            # A negative balance is a reservation queued behind earlier callers
+            return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class SharedTokenBucket:
+    """A TokenBucket kept in a SQLite table, so every process using the file draws from the same tokens"""
+
+    def __init__(self, conn, lock, domain, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.domain = domain
+        self._conn = conn
+        # One transaction at a time on the shared connection
+        self._lock = lock
+
+    def reserve(self):
+        """Take a token and return how long the caller must wait before using it"""
+        with self._lock:
+            # Wall-clock time, the monotonic clock isn't comparable between processes
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated FROM rate_buckets WHERE domain = ?", (self.domain,)
+                ).fetchone()
+                tokens = self.burst if row is None else min(self.burst, row[0] + max(0, now - row[1]) * self.rate)
+                tokens -= 1
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_buckets (domain, tokens, updated) VALUES (?, ?, ?)",
+                    (self.domain, tokens, now)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return 0 if tokens >= 0 else -tokens / self.rate
+
+
+class DomainRateLimiter:
+    """Token-bucket rate limits applied per host instead of one global sleep.
+
+    The buckets live in memory, or in the SQLite file at path so that several
+    processes share each domain's rate.
+    """
+
+    def __init__(self, rate=DOMAIN_RATE_PER_SEC, burst=DOMAIN_BURST, overrides=None, path=None):
+        self.rate = rate
+        self.burst = burst
+        self.overrides = DOMAIN_RATE_OVERRIDES if overrides is None else overrides
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            self._conn = connect(path)
+            # Reservations are made with explicit transactions
+            self._conn.isolation_level = None
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_buckets (domain TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._conn_lock = threading.Lock()
+
+    def _bucket(self, domain):
+        with self._lock:
+            bucket = self._buckets.get(domain)
+            if bucket is None:
+                rate, burst = self.overrides.get(domain, (self.rate, self.burst))
+                if self._conn is None:
+                    bucket = TokenBucket(rate, burst)
+                else:
+                    bucket = SharedTokenBucket(self._conn, self._conn_lock, domain, rate, burst)
+                self._buckets[domain] = bucket
+            return bucket
+
+    def wait(self, url):
+        """Block until a request to the host of url is allowed"""
+        delay = self._bucket(domain_of(url)).reserve()
+        if delay > 0:
+            time.sleep(delay)
+        observe('rate_limit_wait_seconds', delay)
+        return delay
+
+
+_limiter = DomainRateLimiter()
+
+def share_rate_limits(path=RATE_LIMIT_DB_PATH):
+    """Draw this process' requests from buckets shared with every process that calls this"""
+    global _limiter
+    _limiter = DomainRateLimiter(path=path)
+
+def wait_for_slot(url):
+    return _limiter.wait(url)
@@ -1,102 +1,141 @@
 # scraper.py
 
-import requests
-from bs4 import BeautifulSoup
-import time
-import random
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from config import REQUEST_DELAY_MIN_SEC, REQUEST_DELAY_MAX_SEC, MAX_PAGES_PER_SEARCH
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from config import MAX_PAGES_PER_SEARCH, DIRECTORY_WORKERS, DIRECTORY_CACHE_TTL_SEC
+from driver_pool import create_driver
+from fetcher import FetchError, fetch_and_parse
+from cache import get_path_memory
+from lead import Lead
+from metrics import increment
+from parsing import parse_company_cards, parse_job_titles
+from rate_limiter import domain_of
 
 def setup_selenium():
-    options = webdriver.ChromeOptions()
-    options.add_argument('--headless')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    return driver
+    # Standalone driver outside the pool, the caller is responsible for quit()
+    return create_driver()
 
 def scrape_company_directory(url, max_pages=MAX_PAGES_PER_SEARCH):
-    driver = setup_selenium()
-    companies = []
-    
-    for page in range(1, max_pages + 1):
-        try:
-            page_url = f"{url}?page={page}"
-            driver.get(page_url)
-            time.sleep(random.uniform(REQUEST_DELAY_MIN_SEC, REQUEST_DELAY_MAX_SEC))
-            
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            company_cards = soup.find_all('div', class_='company-card')  # Adjust based on actual HTML structure
-            
-            if not company_cards:
-                print(f"No more company cards found on page {page}")
+    return list(iter_company_directory(url, max_pages))
+
+def scrape_company_directories(urls, max_pages=MAX_PAGES_PER_SEARCH, max_workers=DIRECTORY_WORKERS):
+    return list(iter_company_directories(urls, max_pages, max_workers))
+
+def iter_company_directory(url, max_pages=MAX_PAGES_PER_SEARCH, max_workers=DIRECTORY_WORKERS):
+    """Yield companies page by page as the directory is scraped"""
+    yield from iter_company_directories([url], max_pages, max_workers)
+
+def iter_company_directories(urls, max_pages=MAX_PAGES_PER_SEARCH, max_workers=DIRECTORY_WORKERS):
+    """Yield the companies of several directories, fetching up to max_workers pages at once.
+
+    Each directory's pages are yielded in page order. The first empty page
+    marks the end of a directory: pages after it that are still queued are
+    cancelled and no more are requested. Requests to one host are still
+    spaced by the per-domain rate limiter.
+    """
+    # Per directory: next page to request, next page to yield, first page past the end
+    directories = [{'url': url, 'next_page': 1, 'next_yield': 1, 'end': max_pages + 1, 'pages': {}} for url in urls]
+    pending = {}
+
+    def fill():
+        # Round-robin over the directories so every one makes progress
+        while len(pending) < max_workers:
+            submitted = False
+            for directory in directories:
+                if len(pending) >= max_workers:
+                    break
+                # Don't run further ahead of the pages still to be yielded than there are workers
+                if directory['next_page'] < directory['end'] and directory['next_page'] - directory['next_yield'] < max_workers:
+                    page = directory['next_page']
+                    directory['next_page'] += 1
+                    pending[executor.submit(_fetch_directory_page, directory['url'], page)] = (directory, page)
+                    submitted = True
+            if not submitted:
                 break
-            
-            for card in company_cards:
-                try:
-                    company = {
-                        'name': card.find('h3', class_='company-name').text.strip(),
-                        'website': card.find('a', class_='company-website')['href'],
-                        'industry': card.find('span', class_='industry').text.strip(),
-                        'employee_count': card.find('span', class_='employee-count').text.strip(),
-                        'description': card.find('p', class_='description').text.strip()
-                    }
-                    companies.append(company)
-                except Exception as e:
-                    print(f"Error parsing company card: {str(e)}")
-        except Exception as e:
-            print(f"Error scraping page {page}: {str(e)}")
-    
-    driver.quit()
-    return companies
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    directory, page = pending.pop(future)
+                    cards = future.result()
+                    if page >= directory['end']:
+                        continue
+                    if cards is not None and not cards:
+                        print(f"No more company cards found on page {page} of {directory['url']}")
+                        directory['end'] = page
+                        # Early cancellation, later pages of this directory are past its end
+                        for other, (other_directory, other_page) in list(pending.items()):
+                            if other_directory is directory and other_page > page and other.cancel():
+                                del pending[other]
+                                increment('directory_pages_total', outcome='cancelled')
+                    else:
+                        # A page that failed is skipped like before, only an empty page ends the directory
+                        directory['pages'][page] = cards or []
+
+                for directory in directories:
+                    while directory['next_yield'] < directory['end'] and directory['next_yield'] in directory['pages']:
+                        for card in directory['pages'].pop(directory['next_yield']):
+                            yield Lead(**card)
+                        directory['next_yield'] += 1
+                fill()
+        finally:
+            # Stopping early (e.g. enough companies) drops the pages not started yet
+            for future in pending:
+                future.cancel()
+
+def _fetch_directory_page(url, page):
+    """Companies on one directory page as dicts, [] for an empty page and None when it failed"""
+    page_url = f"{url}?page={page}"
+    try:
+        # Plain HTTP first, the page is only rendered in Chrome when it needs JavaScript.
+        # Listings change far more often than team pages, so cached ones expire sooner
+        cards = fetch_and_parse(page_url, parse_company_cards, max_age=DIRECTORY_CACHE_TTL_SEC)
+    except Exception as e:
+        print(f"Error scraping page {page}: {str(e)}")
+        increment('directory_pages_total', outcome='failed')
+        return None
+    increment('directory_pages_total', outcome='ok' if cards else 'empty')
+    return cards
 
 def extract_job_titles(company_url):
-    driver = setup_selenium()
     job_titles = {}
     
     try:
-        # Try different pages where leadership might be listed
+        # Try different pages where leadership might be listed, starting with
+        # the one that worked before and skipping sites known to have none
         possible_paths = ["/about", "/team", "/leadership", "/company", ""]
+        domain = domain_of(company_url)
+        path_memory = get_path_memory()
+        tried_paths = []
+        failed_paths = []
+        found_path = None
         
-        for path in possible_paths:
-            full_url = company_url + path if company_url[-1] != "/" else company_url + path
-            driver.get(full_url)
-            time.sleep(random.uniform(REQUEST_DELAY_MIN_SEC, REQUEST_DELAY_MAX_SEC))
-            
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            
-            # Look for common leadership patterns
-            leadership_sections = [
-                soup.find('section', class_=lambda x: x and 'leadership' in x.lower()),
-                soup.find('div', class_=lambda x: x and 'team' in x.lower()),
-                soup.find('div', class_=lambda x: x and 'leadership' in x.lower()),
-                soup.find('section', class_=lambda x: x and 'team' in x.lower())
-            ]
-            
-            for section in leadership_sections:
-                if section:
-                    leader_elements = section.find_all(['div', 'article'], class_=lambda x: x and any(term in x.lower() for term in ['leader', 'member', 'profile', 'person', 'team-member']))
-                    
-                    if leader_elements:
-                        for leader in leader_elements:
-                            name_elem = leader.find(['h3', 'h4', 'h5', 'strong', 'b'])
-                            title_elem = leader.find(['p', 'span'], class_=lambda x: x and any(term in x.lower() for term in ['title', 'position', 'role']))
-                            
-                            if name_elem and title_elem:
-                                name = name_elem.text.strip()
-                                title = title_elem.text.strip()
-                                job_titles[name] = title
-                        
-                        if job_titles:
-                            break
+        for path in path_memory.order_paths(domain, possible_paths):
+            full_url = company_url.rstrip("/") + path
+            tried_paths.append(path)
+            try:
+                job_titles = fetch_and_parse(full_url, parse_job_titles)
+            except FetchError as e:
+                # Some sites answer 5xx for unknown routes, the other paths may still work
+                print(f"Error fetching {full_url}: {str(e)}")
+                failed_paths.append(path)
+                continue
             
             if job_titles:
+                found_path = path
                 break
+        
+        # A site that failed on every path may just be down, don't remember it as having no team page
+        if tried_paths and (found_path or len(failed_paths) < len(tried_paths)):
+            path_memory.record(domain, found_path, tried_paths)
+        increment('team_pages_tried_total', len(tried_paths))
+        # Sites remembered as having no team page are skipped without a request
+        outcome = 'found' if job_titles else 'none' if tried_paths else 'skipped'
+        increment('job_title_lookups_total', outcome=outcome)
     except Exception as e:
         print(f"Error extracting job titles: {str(e)}")
-    finally:
-        driver.quit()
+        increment('job_title_lookups_total', outcome='error')
         
     return job_titles
@@ -2,10 +2,35 @@
 
 import requests
 import json
-import time
-from config import REQUEST_DELAY_MIN_SEC
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cache import SearchCache, get_search_cache
+from config import (SEARCH_CACHE_ENABLED, SEARCH_WORKERS, SEARCH_MAX_PAGES,
+                    SEARCH_MAX_RETRIES, SEARCH_BACKOFF_SEC, HTTP_TIMEOUT_SEC)
+from lead import Lead
+from metrics import increment, timer
+from rate_limiter import wait_for_slot
 
-def serper_api_search(query, api_key, num_results=10):
+# Retries with exponential backoff on rate limiting and server errors,
+# honouring Retry-After when the API sends it
+_retry = Retry(
+    total=SEARCH_MAX_RETRIES,
+    backoff_factor=SEARCH_BACKOFF_SEC,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=["GET"],
+    respect_retry_after_header=True,
+    raise_on_status=False
+)
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(max_retries=_retry, pool_connections=SEARCH_WORKERS, pool_maxsize=SEARCH_WORKERS))
+
+def serper_api_search(query, api_key, num_results=10, use_cache=SEARCH_CACHE_ENABLED, refresh=False, start=0):
+    """Run a search query, served from the local cache when possible.
+
+    use_cache=False bypasses the cache entirely, refresh=True skips the cached
+    response but stores the fresh one.
+    """
     url = "https://serpapi.com/search"
     
     params = {
@@ -13,13 +38,33 @@ def serper_api_search(query, api_key, num_results=10):
         "api_key": api_key,
         "num": num_results
     }
+    if start:
+        params["start"] = start
+    
+    cache_key = SearchCache.make_key(url, query, num_results, start=start)
+    if use_cache and not refresh:
+        cached = get_search_cache().get(cache_key)
+        if cached is not None:
+            increment('search_requests_total', outcome='cache')
+            return cached
     
     try:
-        response = requests.get(url, params=params)
+        wait_for_slot(url)
+        # Includes the backoff sleeps of retried attempts
+        with timer('search_request_seconds'):
+            response = _session.get(url, params=params, timeout=HTTP_TIMEOUT_SEC)
+        retries = getattr(response.raw, 'retries', None)
+        if retries is not None and retries.history:
+            increment('search_retries_total', len(retries.history))
         response.raise_for_status()  # Raise exception for 4XX/5XX responses
-        return response.json()
+        results = response.json()
+        if use_cache and 'error' not in results:
+            get_search_cache().set(cache_key, results)
+        increment('search_requests_total', outcome='error' if 'error' in results else 'ok')
+        return results
     except requests.exceptions.RequestException as e:
         print(f"API request failed: {str(e)}")
+        increment('search_requests_total', outcome='error')
         return {"error": str(e)}
 
 def extract_company_info(results):
@@ -27,37 +72,86 @@ def extract_company_info(results):
     
     for result in results.get('organic_results', []):
         try:
-            company = {
-                'name': result.get('title', '').split('|')[0].strip(),
-                'website': result.get('link', ''),
-                'description': result.get('snippet', '')
-            }
+            company = Lead(
+                name=result.get('title', '').split('|')[0].strip(),
+                website=result.get('link', ''),
+                description=result.get('snippet', '')
+            )
             companies.append(company)
         except Exception as e:
             print(f"Error extracting company info: {str(e)}")
     
     return companies
 
-def search_multiple_companies(industry_list, api_key, results_per_query=10):
-    all_companies = []
-    
-    for industry in industry_list:
-        query = f"top companies in {industry} industry"
-        print(f"Searching for: {query}")
-        
-        results = serper_api_search(query, api_key, results_per_query)
-        
-        if 'error' in results:
-            print(f"Error in API response for {industry}: {results['error']}")
-            continue
-            
-        companies = extract_company_info(results)
+def search_multiple_companies(industry_list, api_key, results_per_query=10, use_cache=SEARCH_CACHE_ENABLED, refresh=False, max_workers=SEARCH_WORKERS):
+    """Search every industry concurrently, paging until results_per_query is met"""
+    industry_order = {industry: position for position, industry in enumerate(industry_list)}
+    companies = list(iter_search_companies(industry_list, api_key, results_per_query, use_cache, refresh, max_workers))
+    # Industries finish in any order, keep the order they were asked for
+    companies.sort(key=lambda company: industry_order[company['industry']])
+    return companies
+
+def iter_search_companies(industry_list, api_key, results_per_query=10, use_cache=SEARCH_CACHE_ENABLED, refresh=False, max_workers=SEARCH_WORKERS):
+    """Yield companies industry by industry as soon as each industry's search is complete.
+
+    Industries are searched concurrently, but an industry's next page is
+    only requested once its previous page came back with results, so no
+    queries are spent past the last page.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit(industry, start):
+            return executor.submit(_search_industry_page, industry, api_key, results_per_query, start, use_cache, refresh)
         
-        # Add industry info
+        # First page of every industry at once, it tells us the real page size
+        pending = {submit(industry, 0): industry for industry in dict.fromkeys(industry_list)}
+        pages = {}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                industry = pending.pop(future)
+                companies = future.result()
+                if industry not in pages:
+                    if companies is None:
+                        continue
+                    pages[industry] = []
+                # Ran out of results, later pages are empty or duplicates
+                if companies:
+                    pages[industry].append(companies)
+                
+                page_size = len(pages[industry][0]) if pages[industry] else 0
+                page_count = len(pages[industry])
+                wanted_pages = min(-(-results_per_query // page_size), SEARCH_MAX_PAGES) if page_size else 0
+                if companies and page_count < wanted_pages and \
+                        len(_unique_results(pages[industry], results_per_query)) < results_per_query:
+                    pending[submit(industry, page_size * page_count)] = industry
+                else:
+                    yield from _unique_results(pages.pop(industry), results_per_query)
+
+def _unique_results(pages, limit):
+    seen_links = set()
+    unique = []
+    for companies in pages:
         for company in companies:
-            company['industry'] = industry
+            if company['website'] in seen_links:
+                continue
+            seen_links.add(company['website'])
+            unique.append(company)
+    return unique[:limit]
+
+def _search_industry_page(industry, api_key, num_results, start, use_cache, refresh):
+    query = f"top companies in {industry} industry"
+    print(f"Searching for: {query}" + (f" (offset {start})" if start else ""))
+    
+    results = serper_api_search(query, api_key, num_results, use_cache=use_cache, refresh=refresh, start=start)
+    
+    if 'error' in results:
+        print(f"Error in API response for {industry}: {results['error']}")
+        return None
         
-        all_companies.extend(companies)
-        time.sleep(REQUEST_DELAY_MIN_SEC)  # Be nice to the API
+    companies = extract_company_info(results)
+    
+    # Add industry info
+    for company in companies:
+        company['industry'] = industry
     
-    return all_companies
+    return companies
@@ -1,18 +1,21 @@
 import streamlit as st
 import pandas as pd
-import time
 import os
 import sys
+import uuid
 from datetime import datetime
 
 # Import project modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from scraper import scrape_company_directory
-from serper_api import search_multiple_companies
-from filters import apply_pre_scraping_filters
-from ranker import rank_leads
-from data_processor import enhance_company_data
-from exporter import export_to_csv
+from checkpoint import RunCheckpoint, list_runs
+from pipeline import SERPER_SOURCE, SCRAPING_SOURCE
+from job_queue import submit_job, get_job, cancel_job, start_local_workers, FINISHED_STATUSES
+from exporter import export_leads, EXPORT_FORMATS
+from lead import Lead, LeadBatch
+from lead_store import get_lead_store
+from metrics import counter_totals, report_rows, to_json, to_prometheus
+from ranker import RankingFeatures
+from config import DEFAULT_RANKING_WEIGHTS
 
 # Page configuration
 st.set_page_config(
@@ -21,6 +24,15 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_resource
+def background_workers():
+    """Worker processes shared by every session of this server, started once"""
+    return start_local_workers()
+
+background_workers()
+if 'job_ids' not in st.session_state:
+    st.session_state.job_ids = []
+
 # App title and description
 st.title("📊 B2B Lead Generation Tool")
 st.markdown("""
@@ -34,15 +46,28 @@ st.sidebar.title("Settings")
 # Choose data source
 data_source = st.sidebar.radio(
     "Choose Data Source",
-    ["Web Scraping", "Serper API (Google Search)"]
+    [SCRAPING_SOURCE, SERPER_SOURCE]
 )
 
 # API Key input (if Serper is selected)
 api_key = None
-if data_source == "Serper API (Google Search)":
+use_search_cache = True
+refresh_search_cache = False
+if data_source == SERPER_SOURCE:
     api_key = st.sidebar.text_input("Enter Serper API Key", type="password")
     if not api_key:
         st.sidebar.warning("⚠️ API key is required for Serper API")
+    use_search_cache = st.sidebar.checkbox("Reuse cached search results", value=True)
+    refresh_search_cache = st.sidebar.checkbox("Refresh cached results", value=False, disabled=not use_search_cache)
+
+# Company directories to paginate (if Web Scraping is selected), simulated data without them
+directory_urls = []
+if data_source == SCRAPING_SOURCE:
+    directory_text = st.sidebar.text_area(
+        "Company Directory URLs (one per line)",
+        help="{industry} is replaced by each selected industry, e.g. https://example-directory.com/companies/{industry}"
+    )
+    directory_urls = [url.strip() for url in directory_text.split('\n') if url.strip()]
 
 # Target industries
 st.sidebar.subheader("Target Industries")
@@ -86,16 +111,151 @@ if use_ranking:
     max_emp_ranking = st.sidebar.number_input("Maximum Employees", min_value=0, value=1000)
     ranking_keywords = st.sidebar.text_area("Prioritize Companies with Keywords (one per line)")
     
+    with st.sidebar.expander("Ranking Weights"):
+        ranking_weights = {
+            'industry': st.number_input("Industry match", min_value=0, value=DEFAULT_RANKING_WEIGHTS['industry']),
+            'employees': st.number_input("Employee range match", min_value=0, value=DEFAULT_RANKING_WEIGHTS['employees']),
+            'keyword': st.number_input("Per keyword found", min_value=0, value=DEFAULT_RANKING_WEIGHTS['keyword']),
+            'executive': st.number_input("Per executive found", min_value=0, value=DEFAULT_RANKING_WEIGHTS['executive']),
+            'max_executive': st.number_input("Executive points cap", min_value=0, value=DEFAULT_RANKING_WEIGHTS['max_executive'])
+        }
+    
     ranking_criteria = {
         'industry': target_industry,
         'min_employees': min_emp_ranking,
         'max_employees': max_emp_ranking,
-        'keywords': [kw.strip() for kw in ranking_keywords.split('\n') if kw.strip()]
+        'keywords': [kw.strip() for kw in ranking_keywords.split('\n') if kw.strip()],
+        'weights': ranking_weights
     }
 
 # Max companies to scrape
 max_companies = st.sidebar.slider("Maximum Companies to Process", min_value=10, max_value=500, value=100)
 
+def set_leads(leads):
+    """Replace the session's leads, the cached views are rebuilt the next time they are used"""
+    st.session_state.leads_data = leads
+    st.session_state.leads_version = uuid.uuid4().hex
+
+def leads_views():
+    """Flattened DataFrame and summary numbers of the session's leads.
+
+    They are kept in the session and only rebuilt when the leads change,
+    instead of on every widget interaction.
+    """
+    views = st.session_state.get('leads_views')
+    if views is None or views['version'] != st.session_state.get('leads_version'):
+        frame = LeadBatch(st.session_state.leads_data).to_frame(flatten_job_titles=True)
+        industries = frame['industry'].fillna('unknown') if 'industry' in frame else pd.Series('unknown', index=frame.index)
+        scores = pd.to_numeric(frame['relevance_score'], errors='coerce') if 'relevance_score' in frame else None
+        views = {
+            'version': st.session_state.get('leads_version'),
+            'frame': frame,
+            'industry_counts': industries.value_counts(),
+            'avg_score': float(scores.fillna(0).mean()) if scores is not None and len(scores) else 0.0
+        }
+        st.session_state.leads_views = views
+    return views
+
+@st.fragment
+def results_table(frame):
+    """One page of the results, paging only reruns this fragment"""
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        page_size = st.selectbox("Rows per page", options=[25, 50, 100, 250], index=1)
+    pages = max(1, -(-len(frame) // page_size))
+    with col2:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1)
+    start = (page - 1) * page_size
+    st.dataframe(frame.iloc[start:start + page_size], use_container_width=True)
+    st.caption(f"Showing {start + 1}-{min(start + page_size, len(frame))} of {len(frame)} leads")
+
+def load_run_results(run_id, settings):
+    """Load a finished run's leads from its checkpoint into the session"""
+    checkpoint = RunCheckpoint(run_id)
+    # Features of every enriched lead are kept for re-ranking, before top_k cuts the list
+    st.session_state.ranking_features = RankingFeatures(
+        Lead.from_dict(item) for item in checkpoint.load_items('enhance').values()
+    )
+    st.session_state.ranked_with = settings.get('ranking_criteria')
+    st.session_state.run_id = run_id
+    set_leads(LeadBatch(checkpoint.load_items('rank').values()))
+
+def run_report(run_id, key):
+    """Where a run's time went and what it fetched, from the metrics saved with its checkpoint"""
+    metrics = RunCheckpoint(run_id).load_metrics()
+    if not metrics:
+        st.caption("No report was saved for this run.")
+        return
+    
+    run_seconds = sum(h['sum'] for h in metrics['histograms'] if h['name'] == 'run_seconds')
+    pages = counter_totals(metrics, 'pages_fetched_total')
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Run Time", f"{run_seconds:.1f}s")
+    with col2:
+        st.metric("Pages Fetched", sum(pages.values()))
+    with col3:
+        st.metric("From Cache", pages.get('cache', 0) + pages.get('revalidated', 0))
+    with col4:
+        st.metric("Fetch Failures", sum(counter_totals(metrics, 'page_fetch_failures_total').values()))
+    
+    # Stage timings overlap, collection runs while companies are enriched
+    st.markdown("**Timings**")
+    st.dataframe(pd.DataFrame(report_rows(metrics)), use_container_width=True, hide_index=True)
+    st.markdown("**Counters**")
+    st.dataframe(pd.DataFrame([
+        {'counter': counter['name'], 'labels': ', '.join(f"{k}={v}" for k, v in counter['labels'].items()),
+         'value': counter['value']}
+        for counter in metrics['counters']
+    ]), use_container_width=True, hide_index=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Download JSON", to_json(metrics), file_name=f"metrics_{run_id}.json",
+                           mime="application/json", key=f"{key}_json_{run_id}", use_container_width=True)
+    with col2:
+        st.download_button("Download Prometheus", to_prometheus(metrics), file_name=f"metrics_{run_id}.prom",
+                           mime="text/plain", key=f"{key}_prom_{run_id}", use_container_width=True)
+
+@st.fragment(run_every=2)
+def job_status_panel():
+    """Status and partial results of this session's runs, polled without rerunning the page"""
+    for job_id in reversed(st.session_state.job_ids):
+        job = get_job(job_id)
+        if job is None:
+            continue
+        with st.container(border=True):
+            st.markdown(f"**Run {job_id}** · {job['status']}")
+            st.progress(job['progress'])
+            st.caption(job['message'] or "")
+            if job['error']:
+                st.error(job['error'])
+            
+            if job['status'] not in FINISHED_STATUSES:
+                checkpoint = RunCheckpoint(job_id)
+                enriched = checkpoint.count_items('enhance')
+                if enriched:
+                    st.caption(f"{enriched} companies enriched so far, latest:")
+                    st.dataframe(
+                        LeadBatch(checkpoint.recent_items('enhance', 20)).to_frame().reindex(columns=['name', 'website', 'industry']),
+                        use_container_width=True
+                    )
+                if st.button("Cancel", key=f"cancel_{job_id}"):
+                    cancel_job(job_id)
+            else:
+                if job['status'] == 'complete' and st.button("Load results", key=f"load_{job_id}", use_container_width=True):
+                    load_run_results(job_id, job['settings'])
+                    st.rerun()
+                with st.expander("Run report"):
+                    run_report(job_id, key="job")
+
+# Changed ranking criteria re-score the leads already enriched, without running the pipeline again
+if 'ranking_features' in st.session_state:
+    current_criteria = ranking_criteria if use_ranking else None
+    if current_criteria != st.session_state.ranked_with:
+        set_leads(st.session_state.ranking_features.rank(current_criteria))
+        st.session_state.ranked_with = current_criteria
+
 # Main content area with tabs
 tab1, tab2, tab3 = st.tabs(["Generate Leads", "Results", "Export"])
 
@@ -107,133 +267,97 @@ with tab1:
         Data will be collected from selected sources and processed according to your filters and ranking criteria.
     """)
     
+    # Runs are checkpointed, an interrupted one can be picked up where it stopped
+    unfinished_runs = [run_id for run_id, status, _ in list_runs() if status != 'complete']
+    resume_run_id = st.selectbox(
+        "Resume an interrupted run",
+        options=["Start a new run"] + unfinished_runs,
+        help="Resumed runs keep the settings they were started with"
+    )
+    if resume_run_id == "Start a new run":
+        resume_run_id = None
+    
     if st.button("🚀 Generate Leads", use_container_width=True):
-        if not selected_industries:
+        if not selected_industries and not resume_run_id:
             st.error("⚠️ Please select at least one industry")
-        elif data_source == "Serper API (Google Search)" and not api_key:
+        elif data_source == SERPER_SOURCE and not api_key:
             st.error("⚠️ Please enter your Serper API key")
         else:
-            # Progress indicators
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            # Initialize result storage
-            if 'leads_data' not in st.session_state:
-                st.session_state.leads_data = []
-                
-            # Step 1: Collect data
-            status_text.text("🔍 Collecting company data...")
-            all_companies = []
-            
-            if data_source == "Serper API (Google Search)":
-                progress_bar.progress(10)
-                status_text.text(f"🔍 Searching for companies using Serper API...")
-                
-                all_companies = search_multiple_companies(
-                    selected_industries, 
-                    api_key, 
-                    max_companies // len(selected_industries)
-                )
-            else:
-                # Web scraping example (would need to be adapted to actual site structure)
-                # This is a placeholder that simulates scraping
-                for i, industry in enumerate(selected_industries):
-                    progress_value = 10 + (i * 20 // len(selected_industries))
-                    progress_bar.progress(progress_value)
-                    status_text.text(f"🔍 Scraping data for {industry} industry...")
-                    time.sleep(1)  # Simulate scraping delay
-                    
-                    # In real implementation: replace with actual scraping
-                    # url = f"https://example-directory.com/companies/{industry}"
-                    # industry_companies = scrape_company_directory(url)
-                    
-                    # Simulated data for demonstration
-                    industry_companies = [
-                        {
-                            'name': f"{industry.capitalize()} Company {j}",
-                            'website': f"https://www.{industry}company{j}.com",
-                            'industry': industry,
-                            'employee_count': f"{(j+1)*50}-{(j+1)*100}",
-                            'description': f"A leading {industry} company specializing in innovative solutions."
-                        } for j in range(max_companies // len(selected_industries))
-                    ]
-                    
-                    all_companies.extend(industry_companies)
-            
-            status_text.text(f"✅ Collected {len(all_companies)} companies")
-            progress_bar.progress(40)
-            
-            # Step 2: Apply filters
-            if use_filters and filter_settings:
-                status_text.text("🔍 Applying filters...")
-                all_companies = apply_pre_scraping_filters(all_companies, filter_settings)
-                status_text.text(f"✅ {len(all_companies)} companies passed filters")
-            
-            progress_bar.progress(60)
-            
-            # Step 3: Enhance data
-        
-            status_text.text("🔍 Enhancing company data and converting positions to Software Developer...")
-
-            # Use actual data enhancement instead of simulation
-            all_companies = enhance_company_data(all_companies)
-
-            progress_bar.progress(80)
-            
-            # Step 4: Apply ranking
-            if use_ranking and ranking_criteria:
-                status_text.text("🔍 Ranking companies by relevance...")
-                all_companies = rank_leads(all_companies, ranking_criteria)
-            
-            progress_bar.progress(100)
-            status_text.text(f"✅ Successfully generated {len(all_companies)} leads!")
-            
-            # Store results in session state
-            st.session_state.leads_data = all_companies
-            
-            # Show success message
-            st.success(f"Successfully generated {len(all_companies)} leads! Go to the Results tab to view them.")
+            settings = {
+                'data_source': data_source,
+                'directory_urls': directory_urls,
+                'industries': selected_industries,
+                'max_companies': max_companies,
+                'use_search_cache': use_search_cache,
+                'refresh_search_cache': refresh_search_cache,
+                'filters': filter_settings if use_filters else None,
+                'ranking_criteria': ranking_criteria if use_ranking else None
+            }
+            # The run goes to the background workers, this session stays free while it runs
+            job_id = submit_job(settings, api_key, run_id=resume_run_id)
+            if job_id not in st.session_state.job_ids:
+                st.session_state.job_ids.append(job_id)
+            st.success(f"Run {job_id} queued, its progress is shown below.")
+    
+    if st.session_state.job_ids:
+        st.subheader("Your Runs")
+        job_status_panel()
 
 # Results tab
 with tab2:
-    if 'leads_data' in st.session_state and st.session_state.leads_data:
-        leads = st.session_state.leads_data
+    results_view = st.radio("Show", ["This run", "All stored leads"], horizontal=True)
+    
+    if results_view == "All stored leads":
+        # Every lead from earlier runs, filtered and paged by the store's indexes
+        store = get_lead_store()
+        st.header("Lead Store")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            store_industry = st.selectbox("Industry", options=["All"] + store.industries())
+        with col2:
+            store_min_emp = st.number_input("Min. Employees", min_value=0, value=0)
+        with col3:
+            store_max_emp = st.number_input("Max. Employees", min_value=0, value=0, help="0 means no limit")
+        with col4:
+            store_min_score = st.number_input("Min. Relevance Score", min_value=0, value=0)
+        
+        store_filters = {
+            'industry': None if store_industry == "All" else store_industry,
+            'min_employees': store_min_emp or None,
+            'max_employees': store_max_emp or None,
+            'min_score': store_min_score or None
+        }
+        total_stored = store.count(**store_filters)
+        page_size = 50
+        page = st.number_input("Page", min_value=1, max_value=max(1, -(-total_stored // page_size)), value=1)
+        st.caption(f"{total_stored} stored leads match")
+        st.dataframe(
+            store.query(limit=page_size, offset=(page - 1) * page_size, **store_filters).to_frame(),
+            use_container_width=True
+        )
+    elif 'leads_data' in st.session_state and st.session_state.leads_data:
+        views = leads_views()
         
         # Summary metrics
         st.header("Results Summary")
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Total Leads", len(leads))
+            st.metric("Total Leads", len(views['frame']))
         with col2:
-            industry_counts = {}
-            for lead in leads:
-                industry = lead.get('industry', 'unknown')
-                industry_counts[industry] = industry_counts.get(industry, 0) + 1
-            top_industry = max(industry_counts.items(), key=lambda x: x[1])[0]
-            st.metric("Top Industry", top_industry.capitalize())
+            st.metric("Top Industry", str(views['industry_counts'].index[0]).capitalize())
         with col3:
             if use_ranking:
-                avg_score = sum(lead.get('relevance_score', 0) for lead in leads) / len(leads)
-                st.metric("Avg. Relevance Score", f"{avg_score:.1f}")
+                st.metric("Avg. Relevance Score", f"{views['avg_score']:.1f}")
             else:
-                st.metric("Industries", len(set(lead.get('industry', '') for lead in leads)))
+                st.metric("Industries", len(views['industry_counts']))
         
-        # Results table
+        # Results table, paged so only one page is sent to the browser
         st.header("Lead Results")
+        results_table(views['frame'])
         
-        # Prepare DataFrame
-        df_leads = pd.DataFrame(leads)
-        
-        # Handle job titles column (convert dict to string)
-        if 'job_titles' in df_leads.columns:
-            df_leads['job_titles_str'] = df_leads['job_titles'].apply(
-                lambda x: "; ".join([f"{name}: {title}" for name, title in x.items()]) if isinstance(x, dict) else x
-            )
-            df_leads = df_leads.drop('job_titles', axis=1)
-            df_leads = df_leads.rename(columns={'job_titles_str': 'job_titles'})
-        
-        # Display dataframe
-        st.dataframe(df_leads, use_container_width=True)
+        if st.session_state.get('run_id'):
+            with st.expander(f"Run report ({st.session_state.run_id})"):
+                run_report(st.session_state.run_id, key="results")
     else:
         st.info("No leads generated yet. Go to the Generate Leads tab to get started.")
 
@@ -249,37 +373,37 @@ with tab3:
         col1, col2 = st.columns(2)
         
         with col1:
-            st.subheader("Export to CSV")
+            st.subheader("Export to File")
+            export_format = st.selectbox(
+                "Format",
+                options=EXPORT_FORMATS,
+                format_func=str.upper,
+                help="Parquet is columnar and compressed, better suited to large lead lists"
+            )
             export_filename = st.text_input(
-                "Filename", 
-                value=f"lead_generation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+                "Filename",
+                value=f"lead_generation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
             )
-            
-            if st.button("Export to CSV", use_container_width=True):
-                # Create results directory if needed
-                os.makedirs('results', exist_ok=True)
-                filepath = os.path.join('results', export_filename)
-                
-                # Create DataFrame and export
-                df_leads = pd.DataFrame(leads)
-                
-                # Handle job titles column (convert dict to string)
-                if 'job_titles' in df_leads.columns:
-                    df_leads['job_titles'] = df_leads['job_titles'].apply(
-                        lambda x: "; ".join([f"{name}: {title}" for name, title in x.items()]) if isinstance(x, dict) else x
-                    )
-                
-                df_leads.to_csv(filepath, index=False)
-                
-                # Provide download link
-                with open(filepath, 'rb') as f:
-                    st.download_button(
-                        label="Download CSV File",
-                        data=f,
-                        file_name=export_filename,
-                        mime="text/csv",
-                        use_container_width=True
-                    )
+
+            if st.button(f"Export to {export_format.upper()}", use_container_width=True):
+                # Written in chunks by the shared exporter, job titles flattened the same way as the CLI
+                filepath = export_leads(leads, export_filename, export_format)
+
+                # Provide download link, a Parquet export is a directory of parts so it is read back as one file
+                if export_format == 'csv':
+                    with open(filepath, 'rb') as f:
+                        data = f.read()
+                    mime = "text/csv"
+                else:
+                    data = pd.read_parquet(filepath).to_parquet(index=False)
+                    mime = "application/octet-stream"
+                st.download_button(
+                    label=f"Download {export_format.upper()} File",
+                    data=data,
+                    file_name=export_filename,
+                    mime=mime,
+                    use_container_width=True
+                )
         
         with col2:
             st.subheader("Export to Google Sheets")
@@ -296,6 +420,14 @@ with tab3:
                 st.info("Google Sheets export functionality will be implemented here")
     else:
         st.info("No leads generated yet. Go to the Generate Leads tab to get started.")
+    
+    # The lead store keeps every run, it is read back in chunks so size doesn't matter
+    st.subheader("Export All Stored Leads")
+    store_format = st.selectbox("Format", options=EXPORT_FORMATS, format_func=str.upper, key="store_export_format")
+    if st.button("Export Lead Store", use_container_width=True):
+        store_filename = f"lead_store_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{store_format}"
+        filepath = export_leads(get_lead_store().iter_leads(), store_filename, store_format)
+        st.success(f"Lead store exported to {filepath}")
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,113 @@
+# tests/test_cache.py
+
+import pytest
+import cache
+from cache import CrawlCache, PathMemory, normalize_url
+
+
+class Clock:
+    """Stands in for the time module"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def crawl_cache(tmp_path, clock):
+    return CrawlCache(str(tmp_path / 'cache.sqlite'), ttl=100, max_entries=3)
+
+
+def test_urls_are_normalized_so_spellings_share_an_entry():
+    assert normalize_url('HTTPS://www.Example.com:443/team/?b=2&a=1#staff') == 'https://example.com/team?a=1&b=2'
+    assert normalize_url('example.com') != normalize_url('example.com/about')
+    assert normalize_url('http://example.com:8080') == 'http://example.com:8080/'
+
+
+def test_entries_are_kept_per_url_and_parser(crawl_cache):
+    crawl_cache.set('https://www.acme.com/team/', 'parse_job_titles', '<html/>', {'Ann': 'CEO'}, '"v1"', 'Mon')
+
+    entry = crawl_cache.get('https://acme.com/team', 'parse_job_titles')
+    assert entry == {'html': '<html/>', 'etag': '"v1"', 'last_modified': 'Mon', 'result': {'Ann': 'CEO'}, 'fresh': True}
+    assert crawl_cache.get('https://acme.com/team', 'parse_company_cards') is None
+
+
+def test_entries_go_stale_after_the_ttl_and_revalidation_refreshes_them(crawl_cache, clock):
+    crawl_cache.set('https://acme.com/team', 'parse_job_titles', '', {})
+
+    clock.now += 101
+    assert not crawl_cache.get('https://acme.com/team', 'parse_job_titles')['fresh']
+    # A shorter max_age applies to this lookup only
+    clock.now -= 51
+    assert not crawl_cache.get('https://acme.com/team', 'parse_job_titles', max_age=10)['fresh']
+    assert crawl_cache.get('https://acme.com/team', 'parse_job_titles')['fresh']
+
+    clock.now += 51
+    crawl_cache.revalidated('https://acme.com/team', 'parse_job_titles')
+    assert crawl_cache.get('https://acme.com/team', 'parse_job_titles')['fresh']
+
+
+def test_least_recently_used_entries_are_evicted_past_the_cap(crawl_cache, clock):
+    for page in ('a', 'b', 'c'):
+        clock.now += 1
+        crawl_cache.set(f'https://acme.com/{page}', 'parse_job_titles', '', {})
+    clock.now += 1
+    # Reading an entry counts as using it
+    crawl_cache.get('https://acme.com/a', 'parse_job_titles')
+
+    clock.now += 1
+    crawl_cache.set('https://acme.com/d', 'parse_job_titles', '', {})
+
+    kept = [page for page in 'abcd' if crawl_cache.get(f'https://acme.com/{page}', 'parse_job_titles')]
+    assert kept == ['a', 'c', 'd']
+
+
+@pytest.fixture
+def path_memory(tmp_path, clock):
+    return PathMemory(str(tmp_path / 'cache.sqlite'), negative_ttl=100)
+
+
+PATHS = ['/about', '/team', '/leadership', '']
+
+
+def test_paths_keep_the_callers_order_without_history(path_memory):
+    assert path_memory.order_paths('acme.com', PATHS) == PATHS
+
+
+def test_paths_that_work_elsewhere_are_tried_first(path_memory):
+    path_memory.record('a.com', '/leadership', ['/about', '/team', '/leadership'])
+    path_memory.record('b.com', '/leadership', ['/leadership'])
+
+    # '/leadership' worked twice, '/about' and '/team' failed once, '' was never tried
+    assert path_memory.order_paths('c.com', PATHS) == ['/leadership', '', '/about', '/team']
+
+
+def test_the_path_that_worked_for_a_domain_goes_first(path_memory):
+    path_memory.record('b.com', '/team', ['/about', '/team'])
+    path_memory.record('a.com', '/leadership', ['/leadership'])
+    path_memory.record('c.com', '/leadership', ['/leadership'])
+
+    # Elsewhere '/leadership' works best, but b.com had its team on '/team'
+    assert path_memory.order_paths('d.com', PATHS)[0] == '/leadership'
+    assert path_memory.order_paths('b.com', PATHS)[:2] == ['/team', '/leadership']
+
+
+def test_domains_without_a_team_page_are_skipped_until_the_ttl_passes(path_memory, clock):
+    path_memory.record('none.com', None, PATHS)
+    assert path_memory.order_paths('none.com', PATHS) == []
+
+    clock.now += 101
+    assert len(path_memory.order_paths('none.com', PATHS)) == len(PATHS)
+
+    clock.now -= 101
+    path_memory.forget('none.com')
+    assert len(path_memory.order_paths('none.com', PATHS)) == len(PATHS)
@@ -0,0 +1,74 @@
+# tests/test_cli.py
+
+import csv
+import json
+import os
+import pytest
+import cli
+import data_processor
+import lead_store
+
+
+class Killed(Exception):
+    pass
+
+
+class LossyExporter(cli.StreamingExporter):
+    """Small chunks, and a crash loses whatever is still buffered like a killed process would"""
+    crashed = False
+
+    def __init__(self, filepath, format='csv', append=False):
+        super().__init__(filepath, format, append=append, chunk_size=3)
+
+    def close(self):
+        if LossyExporter.crashed:
+            self._rows = []
+        super().close()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # Checkpoints, the lead store and results/ are relative paths, keep them in tmp_path
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(lead_store, '_lead_store', None)
+    monkeypatch.setattr(data_processor, '_enhance_company', lambda company: {**company.to_dict(), 'job_titles': {}})
+    monkeypatch.setattr(cli, 'StreamingExporter', LossyExporter)
+    LossyExporter.crashed = False
+    config = tmp_path / 'settings.json'
+    config.write_text(json.dumps({
+        'data_source': 'scraping', 'industries': ['technology'], 'max_companies': 10,
+        'filters': None, 'ranking_criteria': None, 'skip_enriched': False
+    }))
+    return str(config)
+
+
+def exported_names(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return [row['name'] for row in csv.DictReader(f)]
+
+
+def test_stream_resume_writes_leads_that_were_buffered_when_the_run_died(workdir):
+    seen = []
+
+    def progress(value, message):
+        if message.startswith("🔍 Enhanced"):
+            seen.append(message)
+            if len(seen) == 7:
+                LossyExporter.crashed = True
+                raise Killed()
+
+    with pytest.raises(Killed):
+        cli.run_from_config(workdir, run_id='run1', output='leads.csv', progress=progress, stream=True)
+    # Two chunks of 3 reached the file, the 7th lead was still buffered
+    assert len(exported_names(os.path.join('results', 'leads.csv'))) == 6
+
+    LossyExporter.crashed = False
+    _, path = cli.run_from_config(workdir, run_id='run1', output='leads.csv', progress=lambda *args: None, stream=True)
+    names = exported_names(path)
+    assert sorted(names) == sorted(f"Technology Company {i}" for i in range(10))
+    assert len(names) == len(set(names))
+
+
+def test_stream_export_of_a_run_without_interruptions(workdir):
+    _, path = cli.run_from_config(workdir, run_id='run2', output='leads.csv', progress=lambda *args: None, stream=True)
+    assert sorted(exported_names(path)) == sorted(f"Technology Company {i}" for i in range(10))
@@ -0,0 +1,111 @@
+# tests/test_dedup.py
+
+import copy
+from dedup import DedupIndex, deduplicate_companies, iter_deduplicated, merge_leads, name_tokens
+from lead import Lead
+
+
+def test_name_tokens_drop_title_suffixes_and_noise_words():
+    assert name_tokens("Acme Corp - Home") == frozenset({'acme'})
+    assert name_tokens("Acme Analytics | LinkedIn") == frozenset({'acme', 'analytics'})
+    assert name_tokens("The Company") == frozenset({'the', 'company'})
+    assert name_tokens(None) == frozenset()
+
+
+def test_same_domain_is_the_same_company():
+    index = DedupIndex()
+    assert index.add({'name': "Acme", 'website': "https://www.acme.com/about"}) == (0, True)
+    assert index.add({'name': "Totally Different", 'website': "http://acme.com"}) == (0, False)
+
+
+def test_names_match_on_token_jaccard():
+    index = DedupIndex(name_similarity=0.6)
+    index.add({'name': "Blue River Analytics"})
+    # 2 of 3 tokens shared: 2/4 = 0.5 is below the threshold
+    assert index.add({'name': "Blue River Labs"}) == (1, True)
+    # Same tokens in another order and case
+    assert index.add({'name': "analytics blue river"}) == (0, False)
+    # 3 shared of 4: 0.75
+    assert index.add({'name': "Blue River Analytics Europe"}) == (0, False)
+
+
+def test_union_find_joins_clusters_linked_by_a_later_lead():
+    index = DedupIndex()
+    index.add({'name': "Acme", 'website': "https://acme.com"})
+    index.add({'name': "Zenith Labs", 'website': "https://zenith.io"})
+    # Shares its domain with the first and its name with the second
+    root, is_new = index.add({'name': "Zenith Labs", 'website': "https://acme.com/team"})
+    assert (root, is_new) == (0, False)
+    assert index.absorbed_roots == [1]
+    assert index.clusters() == [[0, 1, 2]]
+
+
+def test_common_tokens_are_not_compared_past_the_block_size():
+    index = DedupIndex(name_similarity=0.5, max_block_size=3)
+    for i in range(5):
+        index.add({'name': f"Solutions {i}"})
+    # 'solutions' has more than 3 leads, only the number token could match
+    assert index.add({'name': "Solutions"})[1] is True
+
+
+def test_merge_leads_fills_missing_fields_and_combines_job_titles():
+    primary = Lead(name="Acme", industry="", job_titles={'Ann': 'CEO'})
+    merge_leads(primary, {'name': "Acme Inc", 'industry': "tech", 'job_titles': {'Ann': 'Founder', 'Bob': 'CTO'}})
+    assert primary.to_dict() == {'name': "Acme", 'industry': "tech", 'job_titles': {'Ann': 'CEO', 'Bob': 'CTO'}}
+
+
+def leads(*specs):
+    return [Lead(name=name, website=website, **fields) for name, website, fields in specs]
+
+
+def test_duplicates_within_the_window_are_merged_before_yielding():
+    companies = leads(
+        ("Acme", "https://acme.com", {}),
+        ("Zenith", "https://zenith.io", {}),
+        ("Acme Inc", "https://www.acme.com", {'industry': 'tech'})
+    )
+    stats = {}
+    result = list(iter_deduplicated(companies, stats=stats, window=5))
+    assert [lead['name'] for lead in result] == ["Acme", "Zenith"]
+    assert result[0]['industry'] == 'tech'
+    assert stats['duplicates'] == 1
+
+
+def test_yielded_leads_are_never_changed():
+    companies = leads(
+        ("Acme", "https://acme.com", {}),
+        ("Zenith", "https://zenith.io", {}),
+        ("Orbit", "https://orbit.dev", {}),
+        ("Acme", "https://acme.com", {'industry': 'tech'})
+    )
+    stats = {}
+    seen = []
+    for lead in iter_deduplicated(companies, stats=stats, window=1):
+        seen.append((lead, copy.deepcopy(lead.to_dict())))
+    # Acme was already yielded when its duplicate arrived, it is dropped unmerged
+    assert [snapshot for _, snapshot in seen] == [lead.to_dict() for lead, _ in seen]
+    assert [lead['name'] for lead, _ in seen] == ["Acme", "Zenith", "Orbit"]
+    assert 'industry' not in seen[0][0]
+    assert stats['duplicates'] == 1
+
+
+def test_pending_clusters_linked_later_become_one_lead():
+    companies = leads(
+        ("Acme", "https://acme.com", {}),
+        ("Zenith Labs", "https://zenith.io", {'industry': 'tech'}),
+        ("Zenith Labs", "https://acme.com", {})
+    )
+    stats = {}
+    result = list(iter_deduplicated(companies, stats=stats, window=10))
+    assert [lead['name'] for lead in result] == ["Acme"]
+    assert result[0]['industry'] == 'tech'
+    assert stats['duplicates'] == 2
+
+
+def test_streaming_matches_batch_dedup_with_a_large_window():
+    names = ["Acme", "Acme Corp", "Zenith Labs", "Orbit", "zenith labs - Home", "Nova", "Orbit Inc"]
+    companies = leads(*[(name, f"https://site{i}.example", {'description': f"d{i}"}) for i, name in enumerate(names)])
+    streamed = [lead.to_dict() for lead in iter_deduplicated(copy.deepcopy(companies), window=100)]
+    batch = [lead.to_dict() for lead in deduplicate_companies(copy.deepcopy(companies))]
+    assert streamed == batch
+    assert [lead['name'] for lead in batch] == ["Acme", "Zenith Labs", "Orbit", "Nova"]
@@ -0,0 +1,72 @@
+# tests/test_exporter.py
+
+import glob
+import os
+import pandas as pd
+import pytest
+from exporter import StreamingExporter, export_row
+from lead import Lead
+
+LEADS = [Lead(name=f"Company {i}", website=f"https://c{i}.example", job_titles={'Ann': 'CEO'}, relevance_score=i)
+         for i in range(7)]
+
+
+def test_export_row_flattens_job_titles():
+    row = export_row(LEADS[0], ('name', 'industry', 'job_titles'))
+    assert row == {'name': "Company 0", 'industry': None, 'job_titles': "Ann: CEO"}
+
+
+def test_csv_writes_in_chunks_and_appends_under_the_existing_header(tmp_path):
+    path = str(tmp_path / 'leads.csv')
+    with StreamingExporter(path, columns=('name', 'relevance_score'), chunk_size=3) as exporter:
+        exporter.write_many(LEADS[:4])
+        # One full chunk is on disk, the fourth row is still buffered
+        assert exporter.rows_written == 3
+    assert exporter.rows_written == 4
+
+    # The appending exporter asks for other columns, the file's header wins
+    with StreamingExporter(path, append=True, chunk_size=3) as exporter:
+        exporter.write_many(LEADS[4:])
+    frame = pd.read_csv(path)
+    assert list(frame.columns) == ['name', 'relevance_score']
+    assert frame['name'].tolist() == [lead['name'] for lead in LEADS]
+
+    with StreamingExporter(path, columns=('name',)) as exporter:
+        exporter.write(LEADS[0])
+    assert pd.read_csv(path)['name'].tolist() == ["Company 0"]
+
+
+def test_parquet_export_is_a_directory_of_part_files(tmp_path):
+    path = str(tmp_path / 'leads.parquet')
+    with StreamingExporter(path, 'parquet', chunk_size=2) as exporter:
+        exporter.write_many(LEADS[:5])
+    with StreamingExporter(path, 'parquet', append=True) as exporter:
+        exporter.write_many(LEADS[5:])
+
+    assert len(glob.glob(os.path.join(path, 'part-*.parquet'))) == 2
+    frame = pd.read_parquet(path)
+    assert sorted(frame['name']) == sorted(lead['name'] for lead in LEADS)
+    assert frame['relevance_score'].dtype == 'float64'
+    assert set(frame['job_titles']) == {"Ann: CEO"}
+
+    # Without append the old parts are replaced
+    with StreamingExporter(path, 'parquet') as exporter:
+        exporter.write(LEADS[0])
+    assert len(glob.glob(os.path.join(path, '*.parquet'))) == 1
+    assert pd.read_parquet(path)['name'].tolist() == ["Company 0"]
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        StreamingExporter('leads.xlsx', 'xlsx')
+
+
+def test_fractional_scores_are_kept_in_parquet(tmp_path):
+    path = str(tmp_path / 'leads.parquet')
+    with StreamingExporter(path, 'parquet') as exporter:
+        exporter.write_many([Lead(name="Half", relevance_score=34.5), Lead(name="Whole", relevance_score=12),
+                             Lead(name="Unranked")])
+
+    scores = pd.read_parquet(path)['relevance_score'].tolist()
+    assert scores[:2] == [34.5, 12.0]
+    assert pd.isna(scores[2])
@@ -0,0 +1,166 @@
+# tests/test_fetcher.py
+
+import contextlib
+import pytest
+import fetcher
+import scraper
+from cache import CrawlCache, PathMemory
+from fetcher import FetchError, fetch_and_parse
+from parsing import parse_job_titles
+
+FILLER = "<p>" + " ".join(["word"] * 60) + "</p>"
+TEAM_PAGE = f"""<html><body>{FILLER}
+<section class="leadership"><div class="team-member"><h3>Ann Lee</h3><p class="job-title">CEO</p></div></section>
+</body></html>"""
+NO_TEAM_PAGE = f"<html><body>{FILLER}</body></html>"
+
+
+class Response:
+    def __init__(self, status_code, text='', content_type='text/html'):
+        self.status_code = status_code
+        self.text = text
+        self.headers = {'Content-Type': content_type}
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    """Serves pages from a {url: Response} dict and renders from another, counting requests and renders"""
+    site = {'served': {}, 'rendered': {}, 'renders': [], 'requests': []}
+    site['cache'] = crawl_cache = CrawlCache(str(tmp_path / 'cache.sqlite'))
+
+    def get(url, headers=None, timeout=None):
+        site['requests'].append(url)
+        site['headers'] = headers
+        return site['served'].get(url, Response(404))
+
+    def render(url):
+        site['renders'].append(url)
+        return site['rendered'].get(url, NO_TEAM_PAGE)
+
+    monkeypatch.setattr(fetcher._session, 'get', get)
+    monkeypatch.setattr(fetcher, 'wait_for_slot', lambda url: None)
+    monkeypatch.setattr(fetcher, 'fetch_rendered', render)
+    monkeypatch.setattr(fetcher, 'run_parser', lambda parse, html: parse(html))
+    monkeypatch.setattr(fetcher, 'get_crawl_cache', lambda: crawl_cache)
+    return site
+
+
+def test_static_pages_with_results_skip_the_browser(site):
+    site['served']['https://a.example/team'] = Response(200, TEAM_PAGE)
+
+    assert fetch_and_parse('https://a.example/team', parse_job_titles) == {'Ann Lee': 'CEO'}
+    assert site['renders'] == []
+
+
+def test_static_pages_without_results_are_rendered_once(site):
+    # The team section is only injected by JavaScript
+    site['served']['https://a.example/team'] = Response(200, NO_TEAM_PAGE)
+    site['rendered']['https://a.example/team'] = TEAM_PAGE
+
+    assert fetch_and_parse('https://a.example/team', parse_job_titles) == {'Ann Lee': 'CEO'}
+    # The rendered result is cached
+    assert fetch_and_parse('https://a.example/team', parse_job_titles) == {'Ann Lee': 'CEO'}
+    assert site['renders'] == ['https://a.example/team']
+
+
+def test_stale_pages_are_revalidated_with_their_validators(site):
+    site['cache'].set('https://a.example/team', 'parse_job_titles', TEAM_PAGE, {'Ann Lee': 'CEO'}, '"v1"', 'Mon')
+    site['cache']._conn.execute("UPDATE crawl_cache SET fetched_at = 0")
+    site['served']['https://a.example/team'] = Response(304)
+
+    assert fetch_and_parse('https://a.example/team', parse_job_titles) == {'Ann Lee': 'CEO'}
+    assert site['headers'] == {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon'}
+    # Answered 304, the entry is fresh again and served without a request
+    assert fetch_and_parse('https://a.example/team', parse_job_titles) == {'Ann Lee': 'CEO'}
+    assert site['requests'] == ['https://a.example/team']
+
+
+def test_pages_empty_after_rendering_are_cached_as_empty(site):
+    site['served']['https://a.example/about'] = Response(200, NO_TEAM_PAGE)
+
+    assert fetch_and_parse('https://a.example/about', parse_job_titles) == {}
+    assert fetch_and_parse('https://a.example/about', parse_job_titles) == {}
+    assert site['renders'] == ['https://a.example/about']
+
+
+@pytest.mark.parametrize('status', [401, 403, 406])
+def test_refused_requests_are_retried_in_the_browser(site, status):
+    site['served']['https://a.example/team'] = Response(status)
+    site['rendered']['https://a.example/team'] = TEAM_PAGE
+
+    assert fetch_and_parse('https://a.example/team', parse_job_titles, use_cache=False) == {'Ann Lee': 'CEO'}
+    assert site['renders'] == ['https://a.example/team']
+
+
+@pytest.mark.parametrize('response', [Response(404), Response(410), Response(200, '{}', 'application/json')])
+def test_missing_pages_are_not_rendered(site, response):
+    site['served']['https://a.example/team'] = response
+
+    assert fetch_and_parse('https://a.example/team', parse_job_titles) == {}
+    assert site['renders'] == []
+
+
+@pytest.mark.parametrize('status', [429, 500, 503])
+def test_server_errors_raise(site, status):
+    site['served']['https://a.example/team'] = Response(status)
+
+    with pytest.raises(FetchError):
+        fetch_and_parse('https://a.example/team', parse_job_titles)
+    assert site['renders'] == []
+
+
+def test_a_failing_path_does_not_stop_the_others(site, tmp_path, monkeypatch):
+    memory = PathMemory(str(tmp_path / 'paths.sqlite'))
+    monkeypatch.setattr(scraper, 'get_path_memory', lambda: memory)
+    site['served']['https://a.example/about'] = Response(500)
+    site['served']['https://a.example/team'] = Response(200, TEAM_PAGE)
+
+    assert scraper.extract_job_titles('https://a.example') == {'Ann Lee': 'CEO'}
+    # The path that worked is remembered and tried first next time
+    assert memory.order_paths('a.example', ['/about', '/team'])[0] == '/team'
+
+
+def test_a_site_failing_on_every_path_is_not_remembered_as_empty(site, tmp_path, monkeypatch):
+    memory = PathMemory(str(tmp_path / 'paths.sqlite'))
+    monkeypatch.setattr(scraper, 'get_path_memory', lambda: memory)
+    for path in ('/about', '/team', '/leadership', '/company', ''):
+        site['served'][f'https://down.example{path}'] = Response(503)
+
+    assert scraper.extract_job_titles('https://down.example') == {}
+    assert memory.order_paths('down.example', ['/about']) == ['/about']
+
+
+def test_rendering_waits_for_the_domain_slot_before_taking_a_browser(monkeypatch):
+    calls = []
+
+    class Driver:
+        page_source = TEAM_PAGE
+
+        def get(self, url):
+            calls.append('get')
+
+    class Pool:
+        def driver(self):
+            calls.append('checkout')
+            return contextlib.nullcontext(Driver())
+
+    monkeypatch.setattr(fetcher, 'wait_for_slot', lambda url: calls.append('slot'))
+    monkeypatch.setattr(fetcher, 'get_driver_pool', Pool)
+
+    assert fetcher.fetch_rendered('https://a.example/team') == TEAM_PAGE
+    assert calls == ['slot', 'checkout', 'get']
+
+
+def test_directory_listings_expire_sooner_than_team_pages(site):
+    listing = ('<div class="company-card"><h3 class="company-name">New</h3><span class="industry">tech</span>'
+               '<span class="employee-count">1-10</span><p class="description">New company.</p>'
+               '<a class="company-website" href="https://new.example">Visit</a></div>')
+    site['served']['https://dir.example/tech?page=1'] = Response(200, listing + FILLER)
+    site['cache'].set('https://dir.example/tech?page=1', 'parse_company_cards', '', [])
+    site['cache'].set('https://a.example/team', 'parse_job_titles', '', {'Ann Lee': 'CEO'})
+    # Both entries were cached two hours ago
+    site['cache']._conn.execute("UPDATE crawl_cache SET fetched_at = fetched_at - 7200")
+
+    assert [card['name'] for card in scraper._fetch_directory_page('https://dir.example/tech', 1)] == ['New']
+    assert fetch_and_parse('https://a.example/team', parse_job_titles) == {'Ann Lee': 'CEO'}
+    assert site['requests'] == ['https://dir.example/tech?page=1']
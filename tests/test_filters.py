@@ -0,0 +1,107 @@
+# tests/test_filters.py
+
+import random
+import numpy as np
+import pandas as pd
+import pytest
+from filters import (apply_pre_scraping_filters, compile_filters, filter_dataframe, map_distinct,
+                     parse_employee_count, parse_employee_range, parse_employee_ranges)
+
+FILTERS = {
+    'min_employees': 100,
+    'industries': ['Technology', 'finance'],
+    'exclude_keywords': ['bankrupt', 'closed']
+}
+
+
+def random_companies(count, seed=5):
+    rng = random.Random(seed)
+    companies = []
+    for i in range(count):
+        company = {'name': f"Company {i}"}
+        if rng.random() < 0.8:
+            company['industry'] = rng.choice(['technology', 'TECHNOLOGY', 'finance', 'retail', ''])
+        if rng.random() < 0.8:
+            company['employee_count'] = rng.choice(['50-99', '100-500', '1,000+', 'n/a', '', '99', '1k'])
+        if rng.random() < 0.8:
+            company['description'] = rng.choice(['now closed', 'closedown sale', 'growing fast', '', 'Bankrupt in 2020'])
+        companies.append(company)
+    return companies
+
+
+def test_compiled_plans_are_shared_and_hashable():
+    plan = compile_filters(FILTERS)
+    assert plan is compile_filters(dict(FILTERS))
+    assert hash(plan) == hash(compile_filters(dict(FILTERS)))
+    assert plan.industries == frozenset({'technology', 'finance'})
+    assert compile_filters(None) is None
+    assert compile_filters({}) is None
+
+
+def test_matches():
+    plan = compile_filters(FILTERS)
+    assert plan.matches({'industry': 'Technology', 'employee_count': '100-500', 'description': 'growing'})
+    assert not plan.matches({'industry': 'retail'})
+    assert not plan.matches({'employee_count': '50-99'})
+    assert not plan.matches({'description': 'The company closed'})
+    # Whole-word keywords, "closedown" isn't "closed"
+    assert plan.matches({'description': 'closedown sale'})
+    # Missing fields pass
+    assert plan.matches({})
+
+
+def test_dataframe_mask_matches_the_per_company_filter():
+    companies = random_companies(2000)
+    expected = [company['name'] for company in apply_pre_scraping_filters(companies, FILTERS)]
+    frame = pd.DataFrame(companies)
+    assert filter_dataframe(frame, FILTERS)['name'].tolist() == expected
+    assert filter_dataframe(frame, None) is frame
+
+
+def test_map_distinct():
+    values = pd.Series(['a', 'b', 'a', 'c'])
+    assert map_distinct(values, str.upper).tolist() == ['A', 'B', 'A', 'C']
+    assert len(map_distinct(pd.Series([], dtype=object), str.upper)) == 0
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('51-200', (51, 200)),
+    ('501-1K', (501, 1000)),
+    ('500-5k', (500, 5000)),
+    ('1-5k', (1000, 5000)),
+    ('1.2-1.8k', (1200, 1800)),
+    ('1.5K - 5K staff', (1500, 5000)),
+    ('10,001+', (10001, None)),
+    ('51–200 employees', (51, 200)),
+    ('100 to 500', (100, 500)),
+    ('1k', (1000, 1000)),
+    ('250', (250, 250)),
+    ('2M+', (2000000, None)),
+    ('unknown', None),
+    ('', None),
+    (None, None),
+    (250, None)
+])
+def test_parse_employee_range(value, expected):
+    assert parse_employee_range(value) == expected
+
+
+def test_parsed_ranges_never_have_low_above_high():
+    for low in ('1', '5', '50', '501', '999', '1.5'):
+        for high in ('1k', '5K', '10k', '1m'):
+            parsed_low, parsed_high = parse_employee_range(f"{low}-{high}")
+            assert parsed_low <= parsed_high
+
+
+def test_parse_employee_count_is_the_lower_bound():
+    assert parse_employee_count('501-1K') == 501
+    assert parse_employee_count('n/a') == 0
+
+
+def test_vectorized_ranges_match_the_scalar_parser():
+    values = ['51-200', '501-1K', '1-5k', '10,001+', 'n/a', None, '51-200']
+    lows, highs = parse_employee_ranges(values)
+    assert lows[:4].tolist() == [51, 501, 1000, 10001]
+    assert highs[:4].tolist() == [200, 1000, 5000, np.inf]
+    assert np.isnan(lows[4]) and np.isnan(lows[5]) and np.isnan(highs[5])
+    assert lows[6] == 51
@@ -0,0 +1,203 @@
+# tests/test_job_queue.py
+
+import os
+import time
+import pytest
+import data_processor
+import job_queue
+import lead_store
+from checkpoint import RunCheckpoint, list_runs
+from lead_store import LeadStore
+from job_queue import _open, _stop_workers, cancel_job, claim_next_job, get_job, run_job, start_local_workers, submit_job
+from config import JOB_STALE_AFTER_SEC
+
+SETTINGS = {'industries': ['tech'], 'max_companies': 2, 'data_source': 'scraping'}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'jobs.sqlite')
+
+
+@pytest.fixture
+def conn(path):
+    conn = _open(path)
+    yield conn
+    conn.close()
+
+
+def stored_key(conn, job_id):
+    return conn.execute("SELECT api_key FROM jobs WHERE job_id = ?", (job_id,)).fetchone()[0]
+
+
+def events(*messages, seen=None):
+    """A stand-in for iter_pipeline that yields one event per message"""
+    def iter_pipeline(settings, api_key=None, run_id=None):
+        if seen is not None:
+            seen['api_key'] = api_key
+        try:
+            for position, message in enumerate(messages):
+                yield {'stage': f'stage{position}', 'progress': position, 'message': message}
+        finally:
+            if seen is not None:
+                seen['closed'] = True
+    return iter_pipeline
+
+
+def test_jobs_are_claimed_oldest_first_and_only_once(path, conn):
+    first = submit_job(SETTINGS, run_id='first', path=path)
+    second = submit_job(SETTINGS, run_id='second', path=path)
+
+    assert claim_next_job(conn, worker_pid=1)['job_id'] == first
+    assert claim_next_job(conn, worker_pid=2)['job_id'] == second
+    assert claim_next_job(conn, worker_pid=3) is None
+    assert get_job(first, path=path)['status'] == 'running'
+    assert get_job(second, path=path)['worker_pid'] == 2
+
+
+def test_the_api_key_is_removed_when_the_job_is_claimed(path, conn):
+    job_id = submit_job(SETTINGS, api_key='secret', path=path)
+    assert stored_key(conn, job_id) == 'secret'
+
+    job = claim_next_job(conn)
+    assert job['api_key'] == 'secret'
+    assert job['settings'] == SETTINGS
+    assert stored_key(conn, job_id) is None
+
+
+def test_a_requeued_job_falls_back_to_the_environment_key(path, conn, monkeypatch):
+    seen = {}
+    monkeypatch.setattr(job_queue, 'iter_pipeline', events("Done", seen=seen))
+    monkeypatch.setenv('SERPER_API_KEY', 'from-env')
+    submit_job(SETTINGS, api_key=None, path=path)
+
+    run_job(conn, claim_next_job(conn))
+    assert seen['api_key'] == 'from-env'
+
+
+def test_stale_jobs_are_requeued_with_a_new_claim(path, conn):
+    job_id = submit_job(SETTINGS, path=path)
+    stale = claim_next_job(conn, worker_pid=1)
+    # Still running but within the grace period, nobody else takes it
+    assert claim_next_job(conn, worker_pid=2) is None
+
+    conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE job_id = ?", (time.time() - JOB_STALE_AFTER_SEC - 1, job_id))
+    fresh = claim_next_job(conn, worker_pid=2)
+    assert fresh['job_id'] == job_id
+    assert fresh['claim_token'] != stale['claim_token']
+    assert get_job(job_id, path=path)['worker_pid'] == 2
+
+
+def test_a_worker_that_lost_its_job_stops_without_touching_it(path, conn, monkeypatch):
+    seen = {}
+    monkeypatch.setattr(job_queue, 'iter_pipeline', events("One", "Two", seen=seen))
+    job_id = submit_job(SETTINGS, path=path)
+    stale = claim_next_job(conn, worker_pid=1)
+    conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE job_id = ?", (time.time() - JOB_STALE_AFTER_SEC - 1, job_id))
+    claim_next_job(conn, worker_pid=2)
+
+    # The slow worker carries on with its old claim
+    run_job(conn, stale)
+
+    assert seen['closed']
+    job = get_job(job_id, path=path)
+    assert (job['status'], job['worker_pid'], job['message']) == ('running', 2, 'Starting')
+
+
+def test_a_lost_job_leaves_the_run_checkpoint_to_its_new_owner(path, conn, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(lead_store, '_lead_store', LeadStore(str(tmp_path / 'leads.sqlite')))
+    monkeypatch.setattr(data_processor, '_enhance_company', lambda company: company)
+    job_id = submit_job(SETTINGS, path=path)
+    job = claim_next_job(conn, worker_pid=1)
+    report = job_queue._report
+    reports = []
+
+    def taken_over_after_the_first_report(conn, job, progress, message):
+        reports.append(message)
+        if len(reports) == 2:
+            # Another worker requeued and claimed the run, and saved its own metrics
+            conn.execute("UPDATE jobs SET claim_token = 'other' WHERE job_id = ?", (job['job_id'],))
+            RunCheckpoint(job_id).save_metrics({'owner': 'other'})
+        return report(conn, job, progress, message)
+
+    monkeypatch.setattr(job_queue, '_report', taken_over_after_the_first_report)
+    run_job(conn, job)
+
+    assert len(reports) == 2
+    assert RunCheckpoint(job_id).load_metrics() == {'owner': 'other'}
+    assert {run_id: status for run_id, status, _ in list_runs()}[job_id] == 'running'
+
+
+def test_the_owner_finishes_its_job(path, conn, monkeypatch):
+    monkeypatch.setattr(job_queue, 'iter_pipeline', events("Working", "Done"))
+    job_id = submit_job(SETTINGS, path=path)
+
+    run_job(conn, claim_next_job(conn))
+
+    job = get_job(job_id, path=path)
+    assert job['status'] == 'complete'
+    assert job['message'].startswith("Done")
+    assert job['finished_at'] is not None
+
+
+def test_cancelling_a_running_job_stops_it_at_its_next_report(path, conn, monkeypatch):
+    seen = {}
+    monkeypatch.setattr(job_queue, 'iter_pipeline', events("One", "Two", seen=seen))
+    job_id = submit_job(SETTINGS, path=path)
+    job = claim_next_job(conn)
+    cancel_job(job_id, path=path)
+
+    run_job(conn, job)
+
+    assert seen['closed']
+    assert get_job(job_id, path=path)['status'] == 'cancelled'
+
+
+def test_cancelling_a_queued_job_keeps_it_from_being_claimed(path, conn):
+    job_id = submit_job(SETTINGS, path=path)
+    cancel_job(job_id, path=path)
+
+    assert claim_next_job(conn) is None
+    assert get_job(job_id, path=path)['status'] == 'cancelled'
+
+
+def test_finished_jobs_can_be_submitted_again_to_resume(path, conn):
+    job_id = submit_job(SETTINGS, path=path)
+    cancel_job(job_id, path=path)
+
+    assert submit_job(SETTINGS, api_key='again', run_id=job_id, path=path) == job_id
+    assert get_job(job_id, path=path)['status'] == 'queued'
+    assert claim_next_job(conn)['api_key'] == 'again'
+
+
+def test_queues_from_before_claim_tokens_are_migrated(path):
+    conn = _open(path)
+    conn.execute("DROP TABLE jobs")
+    conn.execute("CREATE TABLE jobs (job_id TEXT PRIMARY KEY, settings TEXT NOT NULL, api_key TEXT, "
+                 "status TEXT NOT NULL, progress INTEGER NOT NULL DEFAULT 0, message TEXT, error TEXT, "
+                 "worker_pid INTEGER, cancel_requested INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, "
+                 "started_at REAL, heartbeat_at REAL, finished_at REAL)")
+    conn.close()
+
+    submit_job(SETTINGS, run_id='old', path=path)
+    conn = _open(path)
+    try:
+        assert claim_next_job(conn)['claim_token']
+    finally:
+        conn.close()
+
+
+def test_local_workers_are_not_daemonic_and_stop_cleanly(path):
+    [worker] = start_local_workers(1, path)
+    try:
+        assert not worker.daemon
+        # The worker opens the queue once it is ready
+        deadline = time.monotonic() + 60
+        while not os.path.exists(path) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert worker.is_alive()
+    finally:
+        _stop_workers([worker])
+
+    assert worker.exitcode == 0
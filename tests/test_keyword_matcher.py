@@ -0,0 +1,60 @@
+# tests/test_keyword_matcher.py
+
+import random
+import numpy as np
+from keyword_matcher import KeywordMatcher, get_keyword_matcher
+
+
+def test_whole_word_matching():
+    matcher = KeywordMatcher(['AI', 'startup'], whole_word=True)
+    assert matcher.find_all("He said the startups were fine") == set()
+    assert matcher.find_all("An AI-driven startup.") == {'AI', 'startup'}
+    assert not matcher.search("said")
+    assert matcher.search("ai")
+
+
+def test_substring_matching_without_whole_word():
+    matcher = KeywordMatcher(['AI', 'startup'], whole_word=False)
+    assert matcher.find_all("He said the startups were fine") == {'AI', 'startup'}
+
+
+def test_keywords_that_are_prefixes_of_each_other():
+    matcher = KeywordMatcher(['machine', 'machine learning', 'learn'], whole_word=True)
+    assert matcher.find_all("We do machine learning") == {'machine', 'machine learning'}
+    # The longer keyword fails its boundary, the shorter one still matches at the same position
+    assert matcher.find_all("machine learningx") == {'machine'}
+    assert matcher.find_all("machines") == set()
+
+    substring = KeywordMatcher(['machine', 'machine learning', 'learn'], whole_word=False)
+    assert substring.find_all("machine learning") == {'machine', 'machine learning', 'learn'}
+
+
+def test_case_insensitive_duplicates_keep_the_first_spelling():
+    matcher = KeywordMatcher(['AI', 'ai', '', 'Innovation'])
+    assert list(matcher.keywords.values()) == ['AI', 'Innovation']
+    assert matcher.find_all("ai and INNOVATION") == {'AI', 'Innovation'}
+
+
+def test_empty_matcher():
+    matcher = KeywordMatcher([])
+    assert not matcher
+    assert matcher.find_all("anything") == set()
+    assert matcher.hit_counts(["a", "b"]).tolist() == [0, 0]
+
+
+def test_hit_matrix_matches_find_all_per_text():
+    rng = random.Random(7)
+    words = ['ai', 'said', 'machine', 'learning', 'startup', 'startups', 'innovation', 'x', '-', 'AI.']
+    texts = [' '.join(rng.choice(words) for _ in range(rng.randint(0, 12))) for _ in range(300)] + ['', None]
+    keywords = ['AI', 'machine learning', 'machine', 'startup', 'innovation']
+    for whole_word in (True, False):
+        matcher = KeywordMatcher(keywords, whole_word)
+        matrix = matcher.hit_matrix(texts)
+        expected = np.array([[keyword in matcher.find_all(text or '') for keyword in matcher.keywords.values()]
+                             for text in texts])
+        assert (matrix == expected).all()
+        assert matcher.hit_counts(texts).tolist() == [len(matcher.find_all(text or '')) for text in texts]
+
+
+def test_get_keyword_matcher_is_cached():
+    assert get_keyword_matcher(['a', 'b']) is get_keyword_matcher(('a', 'b'))
@@ -0,0 +1,52 @@
+# tests/test_lead.py
+
+import pytest
+from lead import Lead, LeadBatch, format_job_titles
+
+
+def test_lead_behaves_like_a_dict():
+    lead = Lead(name="Acme", website="https://acme.example", source="search")
+    assert lead['name'] == "Acme"
+    assert lead.get('industry') is None
+    assert lead.get('industry', 'n/a') == 'n/a'
+    assert 'website' in lead and 'industry' not in lead
+    assert 'source' in lead and lead['source'] == "search"
+    assert list(lead.keys()) == ['name', 'website', 'source']
+    assert len(lead) == 3
+    with pytest.raises(KeyError):
+        lead['industry']
+
+
+def test_slots_and_overflow_fields():
+    lead = Lead(name="Acme")
+    assert lead._extra is None
+    with pytest.raises(AttributeError):
+        lead.__dict__
+    lead['custom'] = 1
+    assert lead._extra == {'custom': 1}
+
+
+def test_round_trip_and_copy():
+    data = {'name': "Acme", 'job_titles': {'Ann': 'CEO'}, 'relevance_score': 0, 'note': 'x'}
+    lead = Lead.from_dict(data)
+    assert lead.to_dict() == data
+    assert Lead.from_dict(lead) is lead
+    copy = lead.copy()
+    copy['name'] = "Other"
+    assert lead['name'] == "Acme"
+
+
+def test_batch_frame_has_only_present_fields():
+    batch = LeadBatch([{'name': "A", 'job_titles': {'Ann': 'CEO', 'Bob': 'CTO'}}, Lead(name="B", extra=1)])
+    assert all(isinstance(lead, Lead) for lead in batch)
+    frame = batch.to_frame()
+    assert list(frame.columns) == ['name', 'job_titles', 'extra']
+    assert frame['job_titles'].tolist() == ["Ann: CEO; Bob: CTO", None]
+    assert batch.to_frame(flatten_job_titles=False)['job_titles'][0] == {'Ann': 'CEO', 'Bob': 'CTO'}
+    assert batch.to_dicts()[1] == {'name': "B", 'extra': 1}
+
+
+def test_format_job_titles():
+    assert format_job_titles({'Ann': 'CEO'}) == "Ann: CEO"
+    assert format_job_titles("already text") == "already text"
+    assert format_job_titles(None) is None
@@ -0,0 +1,106 @@
+# tests/test_lead_store.py
+
+import pytest
+import data_processor
+import lead_store
+from lead import Lead
+from lead_store import LeadStore
+from pipeline import run_pipeline
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LeadStore(str(tmp_path / 'leads.sqlite'))
+
+
+def enriched_at(store, domain):
+    return store._conn.execute("SELECT enriched_at FROM leads WHERE domain = ?", (domain,)).fetchone()[0]
+
+
+def test_upserts_only_overwrite_fields_the_lead_has(store):
+    store.upsert(Lead(name="Acme", website="https://www.acme.com", industry="tech", job_titles={'Ann': 'CEO'},
+                      relevance_score=40), run_id='run1', enriched=True)
+    # A later run collects the company again without enriching or scoring it
+    store.upsert(Lead(name="Acme Inc", website="http://acme.com/", employee_count="100-500"), run_id='run2')
+
+    lead = store.get("acme.com")
+    assert lead.to_dict() == {'name': "Acme Inc", 'website': "http://acme.com/", 'industry': "tech",
+                              'employee_count': "100-500", 'job_titles': {'Ann': 'CEO'}, 'relevance_score': 40}
+    assert store.count() == 1
+    # A score of 0 is a real score
+    store.upsert({'website': "acme.com", 'relevance_score': 0})
+    assert store.get("acme.com")['relevance_score'] == 0
+
+
+def test_companies_without_a_website_are_skipped(store):
+    assert store.upsert_many([{'name': "No site"}, {'name': "Site", 'website': "https://site.example"}]) == 1
+
+
+def test_get_enriched_honours_the_age_limit(store):
+    store.upsert({'name': "Acme", 'website': "https://acme.com", 'job_titles': {'Ann': 'CEO'}}, enriched=True)
+    store.upsert({'name': "Plain", 'website': "https://plain.com"})
+    assert store.get_enriched("https://acme.com")['job_titles'] == {'Ann': 'CEO'}
+    assert store.get_enriched("https://acme.com", max_age=-1) is None
+    assert store.get_enriched("https://plain.com") is None
+    assert store.get_enriched(None) is None
+
+
+def test_query_filters_and_paging(store):
+    store.upsert_many([
+        {'name': "A", 'website': "https://a.com", 'industry': "Tech", 'employee_count': "50-99", 'relevance_score': 10},
+        {'name': "B", 'website': "https://b.com", 'industry': "tech", 'employee_count': "100-500", 'relevance_score': 30},
+        {'name': "C", 'website': "https://c.com", 'industry': "finance", 'employee_count': "1,000+", 'relevance_score': 20},
+        {'name': "D", 'website': "https://d.com", 'industry': "tech", 'employee_count': "n/a"}
+    ])
+    names = lambda batch: [lead['name'] for lead in batch]
+    assert names(store.query()) == ["B", "C", "A", "D"]
+    assert names(store.query(industry="TECH", order_by='name')) == ["A", "B", "D"]
+    assert names(store.query(min_employees=200)) == ["B", "C"]
+    assert names(store.query(max_employees=99)) == ["A"]
+    assert names(store.query(min_score=15)) == ["B", "C"]
+    assert names(store.query(limit=2, offset=1)) == ["C", "A"]
+    assert store.count(industry="tech", min_score=5) == 2
+    assert names(store.iter_leads(chunk_size=1, industry="tech")) == ["B", "A", "D"]
+    assert store.industries() == ["finance", "Tech"]
+
+
+def test_pipeline_reuses_stored_enrichments_and_keeps_their_date(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = LeadStore(str(tmp_path / 'leads.sqlite'))
+    monkeypatch.setattr(lead_store, '_lead_store', store)
+    calls = []
+
+    def enhance(company):
+        calls.append(company['name'])
+        company['job_titles'] = {'Ann': 'CEO'}
+        return company
+
+    monkeypatch.setattr(data_processor, '_enhance_company', enhance)
+    settings = {'data_source': 'scraping', 'industries': ['technology'], 'max_companies': 20,
+                'filters': None, 'ranking_criteria': None}
+    messages = []
+    run_pipeline(settings, run_id='first', progress=lambda value, message: messages.append(message))
+    assert len(calls) == 20
+    assert "0 reused from the lead store" in messages[-2]
+    first_dates = {domain: enriched_at(store, domain) for domain, in store._conn.execute("SELECT domain FROM leads")}
+
+    run_pipeline(settings, run_id='second', progress=lambda value, message: messages.append(message))
+    assert len(calls) == 20
+    assert "20 reused from the lead store" in messages[-2]
+    assert {domain: enriched_at(store, domain) for domain in first_dates} == first_dates
+    assert store._conn.execute("SELECT DISTINCT run_id FROM leads").fetchall() == [('second',)]
+
+
+def test_reused_enrichments_leave_the_old_score_behind(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = LeadStore(str(tmp_path / 'leads.sqlite'))
+    monkeypatch.setattr(lead_store, '_lead_store', store)
+    store.upsert({'name': "Technology Company 0", 'website': "https://www.technologycompany0.com",
+                  'job_titles': {'Ann': 'CEO'}, 'relevance_score': 87.5}, enriched=True)
+    settings = {'data_source': 'scraping', 'industries': ['technology'], 'max_companies': 1,
+                'filters': None, 'ranking_criteria': None}
+
+    _, [company] = run_pipeline(settings, run_id='unranked', progress=lambda value, message: None)
+
+    assert company['job_titles'] == {'Ann': 'CEO'}
+    assert company.get('relevance_score') is None
@@ -0,0 +1,130 @@
+# tests/test_metrics.py
+
+import json
+import pytest
+import metrics
+from metrics import (Histogram, MetricsRegistry, counter_totals, counter_value, increment, report_rows,
+                     reset_metrics, snapshot, timed, timed_iter, to_json, to_prometheus, write_metrics)
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+def histogram(bounds, *values):
+    result = Histogram(bounds)
+    for value in values:
+        result.observe(value)
+    return result
+
+
+def test_quantiles_interpolate_inside_their_bucket():
+    latencies = histogram((1, 2, 5), 0.5, 1.5, 1.5, 4)
+    assert latencies.counts == [1, 2, 1, 0]
+    # The median falls halfway through the (1, 2] bucket
+    assert latencies.quantile(0.5) == pytest.approx(1.5)
+    assert latencies.quantile(0.75) == pytest.approx(2.0)
+
+
+@pytest.mark.parametrize('q, expected', [(0, 0.5), (0.95, 4), (1, 4)])
+def test_quantiles_stay_within_the_values_seen(q, expected):
+    assert histogram((1, 2, 5), 0.5, 1.5, 1.5, 4).quantile(q) == pytest.approx(expected)
+
+
+def test_the_inf_bucket_is_bounded_by_the_largest_value():
+    assert histogram((1,), 0.5, 10).quantile(0.75) == pytest.approx(5.5)
+    assert Histogram((1,)).quantile(0.5) is None
+
+
+def test_values_on_a_bound_count_in_that_bucket():
+    assert histogram((1, 2), 1, 2, 3).counts == [1, 1, 1]
+
+
+def test_counters_are_kept_per_label_set():
+    increment('pages_total', tier='cache')
+    increment('pages_total', 2, tier='http')
+    increment('pages_total', tier='http')
+
+    assert counter_value('pages_total') == 4
+    assert counter_value('pages_total', tier='http') == 3
+    assert counter_value('pages_total', tier='selenium') == 0
+    assert counter_totals(snapshot(), 'pages_total') == {'cache': 1, 'http': 3}
+
+
+def test_snapshot_buckets_are_cumulative():
+    registry = MetricsRegistry(buckets=(2, 1))
+    for value in (0.5, 1.5, 3):
+        registry.observe('fetch_seconds', value, tier='http')
+
+    [series] = registry.snapshot()['histograms']
+    assert series['labels'] == {'tier': 'http'}
+    assert series['buckets'] == [[1, 1], [2, 2], ['+Inf', 3]]
+    assert (series['count'], series['min'], series['max']) == (3, 0.5, 3)
+    assert series['sum'] == pytest.approx(5.0)
+
+
+def test_timers_observe_calls_that_raise():
+    @timed('call_seconds', step='fail')
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        fail()
+    [series] = snapshot()['histograms']
+    assert (series['name'], series['labels'], series['count']) == ('call_seconds', {'step': 'fail'}, 1)
+
+
+def test_timed_iter_observes_once_and_closes_the_iterable_when_stopped_early():
+    closed = []
+
+    def numbers():
+        try:
+            yield from range(10)
+        finally:
+            closed.append(True)
+
+    wrapped = timed_iter(numbers(), 'stage_seconds', stage='collect')
+    assert [next(wrapped), next(wrapped)] == [0, 1]
+    wrapped.close()
+
+    assert closed == [True]
+    [series] = snapshot()['histograms']
+    assert (series['labels'], series['count']) == ({'stage': 'collect'}, 1)
+
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry(buckets=(1,))
+    registry.increment('pages_total', tier='ca"che')
+    registry.observe('fetch_seconds', 0.25)
+
+    assert to_prometheus(registry.snapshot()).splitlines() == [
+        '# TYPE leadgen_pages_total counter',
+        'leadgen_pages_total{tier="ca\\"che"} 1',
+        '# TYPE leadgen_fetch_seconds histogram',
+        'leadgen_fetch_seconds_bucket{le="1"} 1',
+        'leadgen_fetch_seconds_bucket{le="+Inf"} 1',
+        'leadgen_fetch_seconds_sum 0.25',
+        'leadgen_fetch_seconds_count 1'
+    ]
+
+
+def test_snapshots_survive_a_json_round_trip(tmp_path):
+    increment('pages_total', tier='cache')
+    metrics.observe('fetch_seconds', 0.3, tier='cache')
+    taken = snapshot()
+
+    assert json.loads(to_json(taken)) == taken
+    assert json.loads(open(write_metrics(str(tmp_path / 'run.json'), taken)).read()) == taken
+    assert open(write_metrics(str(tmp_path / 'run.prom'), taken)).read() == to_prometheus(taken)
+
+
+def test_report_rows_put_the_slowest_timing_first():
+    metrics.observe('parse_seconds', 0.1)
+    metrics.observe('fetch_seconds', 2.0, tier='http')
+
+    rows = report_rows(snapshot())
+    assert [row['timing'] for row in rows] == ['fetch_seconds (tier=http)', 'parse_seconds']
+    assert rows[0]['mean_sec'] == 2.0
@@ -0,0 +1,53 @@
+# tests/test_parsing.py
+
+import multiprocessing
+from parsing import get_parse_pool, parse_company_cards, parse_job_titles, run_parser
+
+TEAM_PAGE = """
+<html><body>
+  <section class="leadership">
+    <div class="team-member"><h3>Ann Lee</h3><p class="job-title">CEO</p></div>
+    <div class="team-member"><h3>Bob Ray</h3><p class="job-title">CTO</p></div>
+  </section>
+</body></html>
+"""
+
+DIRECTORY_PAGE = """
+<div class="company-card">
+  <h3 class="company-name">Acme</h3>
+  <span class="industry">tech</span>
+  <span class="employee-count">51-200</span>
+  <p class="description">Makes everything.</p>
+  <a class="company-website" href="https://acme.com">Visit</a>
+</div>
+"""
+
+
+def parse_in_daemon(results):
+    """Runs in a daemonic child, which may not start a process pool"""
+    try:
+        results.put(('ok', get_parse_pool() is None, run_parser(parse_job_titles, TEAM_PAGE)))
+    except Exception as e:
+        results.put(('error', False, repr(e)))
+
+
+def test_parsers_read_team_and_directory_pages():
+    assert parse_job_titles(TEAM_PAGE) == {'Ann Lee': 'CEO', 'Bob Ray': 'CTO'}
+    cards = parse_company_cards(DIRECTORY_PAGE)
+    assert [(card['name'], card['website']) for card in cards] == [('Acme', 'https://acme.com')]
+    assert parse_job_titles('') == {}
+
+
+def test_daemonic_processes_parse_inline():
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    worker = context.Process(target=parse_in_daemon, args=(results,), daemon=True)
+    worker.start()
+    try:
+        status, inline, titles = results.get(timeout=60)
+    finally:
+        worker.join(timeout=10)
+
+    assert status == 'ok', titles
+    assert inline
+    assert titles == {'Ann Lee': 'CEO', 'Bob Ray': 'CTO'}
@@ -0,0 +1,66 @@
+# tests/test_pipeline.py
+
+import pytest
+import data_processor
+import lead_store
+from checkpoint import RunCheckpoint
+from lead_store import LeadStore
+from pipeline import iter_pipeline, run_pipeline
+
+SETTINGS = {'data_source': 'scraping', 'industries': ['technology'], 'max_companies': 100,
+            'filters': None, 'ranking_criteria': None, 'skip_enriched': False}
+
+
+@pytest.fixture
+def enhanced(tmp_path, monkeypatch):
+    """Names of the companies enriched, without touching the network"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(lead_store, '_lead_store', LeadStore(str(tmp_path / 'leads.sqlite')))
+    calls = []
+
+    def enhance(company):
+        calls.append(company['name'])
+        company['job_titles'] = {f"Lead of {company['name']}": 'CEO'}
+        return company
+
+    monkeypatch.setattr(data_processor, '_enhance_company', enhance)
+    return calls
+
+
+def interrupt_after(run_id, enrichments):
+    events = iter_pipeline(SETTINGS, run_id=run_id)
+    seen = 0
+    for event in events:
+        if event['stage'] == 'enhance' and event['company'] is not None:
+            seen += 1
+            if seen == enrichments:
+                break
+    events.close()
+
+
+def test_a_run_interrupted_while_collecting_keeps_its_enrichments(enhanced):
+    interrupt_after('run', 60)
+    # Collection was still running, so the resume has to collect again
+    assert not RunCheckpoint('run').is_complete('filter')
+    enhanced.clear()
+
+    messages = []
+    _, companies = run_pipeline(SETTINGS, run_id='run', progress=lambda value, message: messages.append(message))
+
+    assert len(enhanced) == 40
+    assert len(companies) == 100
+    assert all(company['job_titles'] for company in companies)
+    assert "60 restored from the interrupted run" in messages[-2]
+    assert RunCheckpoint('run').load_items('restore') == {}
+
+
+def test_restored_enrichments_survive_a_second_interruption(enhanced):
+    interrupt_after('run', 60)
+    # Interrupted again before the collection reached the earlier enrichments
+    interrupt_after('run', 1)
+    enhanced.clear()
+
+    _, companies = run_pipeline(SETTINGS, run_id='run', progress=lambda value, message: None)
+
+    assert len(enhanced) == 40
+    assert [company['name'] for company in companies] == [f"Technology Company {j}" for j in range(100)]
@@ -0,0 +1,83 @@
+# tests/test_ranker.py
+
+import copy
+import random
+import numpy as np
+import pytest
+from lead import Lead
+from ranker import RankingFeatures, rank_leads, rank_leads_vectorized, top_indices, _rank_loop
+
+CRITERIA = {
+    'industry': 'Technology',
+    'min_employees': 100,
+    'max_employees': 1000,
+    'keywords': ['innovation', 'startup', 'AI', 'machine learning']
+}
+
+
+def random_leads(count, seed=3):
+    rng = random.Random(seed)
+    industries = ['technology', 'Technology', 'finance', 'healthcare', '', None]
+    employee_counts = ['50-100', '100-500', '1,000+', '1k-5k', '501-1000', 'unknown', '', None]
+    words = ['innovation', 'startup', 'AI', 'said', 'machine learning', 'machines', 'solutions', 'leading']
+    leads = []
+    for i in range(count):
+        lead = Lead(name=f"Company {i}", website=f"https://company{i}.example")
+        if rng.random() < 0.9:
+            lead['industry'] = rng.choice(industries)
+        if rng.random() < 0.9:
+            lead['employee_count'] = rng.choice(employee_counts)
+        if rng.random() < 0.9:
+            lead['description'] = ' '.join(rng.choice(words) for _ in range(rng.randint(0, 8)))
+        if rng.random() < 0.8:
+            lead['job_titles'] = {f"Person {j}": "CEO" for j in range(rng.randint(0, 7))}
+        leads.append(lead)
+    return leads
+
+
+def ranked(companies):
+    return [(company['name'], company['relevance_score']) for company in companies]
+
+
+@pytest.mark.parametrize('top_k', [None, 0, 1, 25, 2999, 5000])
+@pytest.mark.parametrize('criteria', [
+    CRITERIA,
+    {**CRITERIA, 'weights': {'industry': 1, 'keyword': 7.5, 'max_executive': 3}},
+    {'keywords': ['AI']},
+    {'industry': 'finance', 'min_employees': 0}
+])
+def test_vectorized_ranking_matches_the_loop(criteria, top_k):
+    leads = random_leads(3000)
+    expected = _rank_loop(copy.deepcopy(leads), criteria, top_k)
+    actual = rank_leads_vectorized(copy.deepcopy(leads), criteria, top_k)
+    assert ranked(actual) == ranked(expected)
+
+
+def test_rank_leads_without_criteria_keeps_the_order():
+    leads = random_leads(10)
+    assert rank_leads(leads, None) is leads
+
+
+def test_features_rerank_like_a_fresh_ranking():
+    leads = random_leads(500)
+    features = RankingFeatures(copy.deepcopy(leads))
+    for criteria in (CRITERIA, {**CRITERIA, 'keywords': ['startup', 'solutions']}, {**CRITERIA, 'industry': 'finance'}):
+        assert ranked(features.rank(criteria)) == ranked(_rank_loop(copy.deepcopy(leads), criteria, None))
+    assert len(features.rank(None)) == 500
+
+
+def test_top_indices_keeps_input_order_for_ties():
+    scores = np.array([5, 1, 5, 3, 5, 3])
+    assert top_indices(scores).tolist() == [0, 2, 4, 3, 5, 1]
+    assert top_indices(scores, 2).tolist() == [0, 2]
+    assert top_indices(scores, 4).tolist() == [0, 2, 4, 3]
+    assert top_indices(scores, 0).tolist() == []
+    assert top_indices(scores, 10).tolist() == [0, 2, 4, 3, 5, 1]
+
+
+def test_top_indices_matches_a_stable_sort():
+    rng = np.random.default_rng(1)
+    scores = rng.integers(0, 20, size=1000)
+    full = np.argsort(-scores, kind='stable')
+    for k in (1, 10, 137, 999):
+        assert top_indices(scores, k).tolist() == full[:k].tolist()
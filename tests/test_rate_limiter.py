@@ -0,0 +1,82 @@
+# tests/test_rate_limiter.py
+
+import pytest
+import rate_limiter
+from rate_limiter import DomainRateLimiter, TokenBucket, domain_of
+
+
+class Clock:
+    """Stands in for the time module, sleeping only moves the clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    return clock
+
+
+def test_the_burst_is_free_then_reservations_queue_up(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    # Each caller past the burst waits behind the ones before it
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_tokens_refill_at_the_rate_up_to_the_burst(clock):
+    bucket = TokenBucket(rate=2, burst=2)
+    bucket.reserve()
+    bucket.reserve()
+
+    clock.now += 0.5
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.5)
+
+    # A long idle period doesn't save up more than the burst
+    clock.now += 60
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, pytest.approx(0.5)]
+
+
+def test_limits_are_per_domain_with_overrides(clock):
+    limiter = DomainRateLimiter(rate=1, burst=1, overrides={'fast.example': (10, 1)})
+
+    assert limiter.wait('https://www.slow.example/a') == 0
+    assert limiter.wait('http://slow.example/b') == pytest.approx(1)
+    assert limiter.wait('https://fast.example/') == 0
+    assert limiter.wait('https://fast.example/') == pytest.approx(0.1)
+    assert limiter.wait('https://other.example/') == 0
+    assert clock.slept == [pytest.approx(1), pytest.approx(0.1)]
+
+
+def test_domain_of_drops_www_and_case():
+    assert domain_of('https://WWW.Example.com/team') == 'example.com'
+    assert domain_of('example.com') == 'example.com'
+
+
+def test_limiters_sharing_a_file_share_each_domains_rate(tmp_path, clock):
+    path = str(tmp_path / 'rate_limits.sqlite')
+    # Like two job worker processes, each with its own connection
+    first = DomainRateLimiter(rate=1, burst=1, overrides={}, path=path)
+    second = DomainRateLimiter(rate=1, burst=1, overrides={}, path=path)
+
+    assert first._bucket('a.example').reserve() == 0
+    assert second._bucket('a.example').reserve() == pytest.approx(1)
+    assert first._bucket('a.example').reserve() == pytest.approx(2)
+    # Other domains have their own bucket
+    assert second._bucket('b.example').reserve() == 0
@@ -0,0 +1,106 @@
+# tests/test_scraper.py
+
+import threading
+import time
+import pytest
+import scraper
+from scraper import iter_company_directories
+
+
+@pytest.fixture
+def directory(monkeypatch):
+    """Fake directory pages: {url: {page: cards or None}} plus the (url, page) requests made"""
+    site = {'pages': {}, 'delays': {}, 'requested': [], 'lock': threading.Lock()}
+
+    def fetch(url, page):
+        with site['lock']:
+            site['requested'].append((url, page))
+        time.sleep(site['delays'].get((url, page), 0))
+        # Past the last page a directory lists nobody
+        return site['pages'].get(url, {}).get(page, [])
+
+    monkeypatch.setattr(scraper, '_fetch_directory_page', fetch)
+    return site
+
+
+def cards(url, page, count=2):
+    return [{'name': f"{url} p{page} #{i}"} for i in range(count)]
+
+
+def names(companies):
+    return [company['name'] for company in companies]
+
+
+def test_pages_are_yielded_in_order_whatever_order_they_finish_in(directory):
+    directory['pages']['a'] = {page: cards('a', page) for page in range(1, 6)}
+    # Earlier pages take longest
+    directory['delays'].update({('a', page): (6 - page) * 0.02 for page in range(1, 6)})
+
+    companies = list(iter_company_directories(['a'], max_pages=10, max_workers=4))
+
+    assert names(companies) == [name for page in range(1, 6) for name in names(cards('a', page))]
+
+
+def test_each_directory_keeps_its_own_order(directory):
+    for url in ('a', 'b'):
+        directory['pages'][url] = {page: cards(url, page) for page in range(1, 4)}
+    directory['delays'][('a', 1)] = 0.05
+
+    companies = names(iter_company_directories(['a', 'b'], max_pages=10, max_workers=3))
+
+    for url in ('a', 'b'):
+        assert [name for name in companies if name.startswith(url)] == [
+            name for page in range(1, 4) for name in names(cards(url, page))
+        ]
+
+
+def test_requests_run_at_most_max_workers_pages_ahead_of_the_output(monkeypatch):
+    requested = []
+
+    def fetch(url, page):
+        requested.append(page)
+        if page == 1:
+            # Later pages finish meanwhile, but nothing may run further ahead
+            time.sleep(0.2)
+            assert sorted(requested) == [1, 2]
+        return cards(url, page)
+
+    monkeypatch.setattr(scraper, '_fetch_directory_page', fetch)
+    companies = list(iter_company_directories(['a'], max_pages=19, max_workers=2))
+
+    assert len(companies) == 2 * 19
+    assert sorted(requested) == list(range(1, 20))
+
+
+def test_an_empty_page_ends_the_directory_and_cancels_later_pages(directory):
+    # Page 3 is empty, the pages listed after it must not be yielded
+    directory['pages']['a'] = {page: cards('a', page) for page in range(1, 30) if page != 3}
+    directory['delays'].update({('a', page): 0.05 for page in range(4, 30)})
+
+    companies = names(iter_company_directories(['a'], max_pages=29, max_workers=4))
+
+    assert companies == names(cards('a', 1)) + names(cards('a', 2))
+    # Only pages already in flight when page 3 came back empty were requested
+    assert max(page for _, page in directory['requested']) < 3 + 4
+
+
+def test_a_failed_page_is_skipped_without_ending_the_directory(directory):
+    directory['pages']['a'] = {1: cards('a', 1), 2: None, 3: cards('a', 3)}
+
+    companies = names(iter_company_directories(['a'], max_pages=10, max_workers=2))
+
+    assert companies == names(cards('a', 1)) + names(cards('a', 3))
+
+
+def test_stopping_early_requests_no_more_pages(directory):
+    directory['pages']['a'] = {page: cards('a', page) for page in range(1, 51)}
+    directory['delays'].update({('a', page): 0.01 for page in range(1, 51)})
+
+    companies = iter_company_directories(['a'], max_pages=50, max_workers=2)
+    next(companies)
+    companies.close()
+    requested = len(directory['requested'])
+    time.sleep(0.05)
+
+    assert len(directory['requested']) == requested
+    assert requested < 50
@@ -0,0 +1,48 @@
+# tests/test_serper_api.py
+
+import threading
+import serper_api
+from lead import Lead
+
+
+def fake_pages(monkeypatch, results_by_industry):
+    """Serve results_by_industry[industry] in pages of page_size, recording every request"""
+    requested = []
+    lock = threading.Lock()
+
+    def search_page(industry, api_key, num_results, start, use_cache, refresh):
+        with lock:
+            requested.append((industry, start))
+        results, page_size = results_by_industry[industry]
+        return [Lead(name=name, website=f"https://{name}.example", industry=industry)
+                for name in results[start:start + page_size]]
+
+    monkeypatch.setattr(serper_api, '_search_industry_page', search_page)
+    return requested
+
+
+def test_pages_until_results_per_query_is_met(monkeypatch):
+    requested = fake_pages(monkeypatch, {'tech': ([f"t{i}" for i in range(100)], 10)})
+    companies = serper_api.search_multiple_companies(['tech'], 'key', results_per_query=25)
+    assert [company['name'] for company in companies] == [f"t{i}" for i in range(25)]
+    assert sorted(requested) == [('tech', 0), ('tech', 10), ('tech', 20)]
+
+
+def test_no_page_is_requested_past_an_empty_one(monkeypatch):
+    requested = fake_pages(monkeypatch, {
+        'tech': ([f"t{i}" for i in range(15)], 10),
+        'finance': ([f"f{i}" for i in range(10)], 10)
+    })
+    companies = serper_api.search_multiple_companies(['tech', 'finance'], 'key', results_per_query=100)
+    assert [company['name'] for company in companies] == [f"t{i}" for i in range(15)] + [f"f{i}" for i in range(10)]
+    # Each industry stops at its first empty page instead of queueing up to SEARCH_MAX_PAGES
+    assert sorted(requested) == [('finance', 0), ('finance', 10), ('tech', 0), ('tech', 10), ('tech', 20)]
+
+
+def test_failed_first_page_skips_the_industry(monkeypatch):
+    fake_pages(monkeypatch, {'tech': ([f"t{i}" for i in range(5)], 10)})
+    original = serper_api._search_industry_page
+    monkeypatch.setattr(serper_api, '_search_industry_page',
+                        lambda industry, *args: None if industry == 'broken' else original(industry, *args))
+    companies = serper_api.search_multiple_companies(['broken', 'tech'], 'key', results_per_query=10)
+    assert [company['name'] for company in companies] == [f"t{i}" for i in range(5)]